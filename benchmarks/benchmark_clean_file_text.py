@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+#
+# This program measures the throughput of the comment and string removal
+# used when parsing C and C++ files, and compares it with the original
+# per-character implementation.
+#
+# Usage:
+# benchmark_clean_file_text.py [<size in MB>]
+#
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import makemake_lib
+
+
+def legacy_clean_file_text(text):
+
+    # This is the per-character implementation previously used by
+    # c_source.clean_file_text, kept here for reference.
+
+    lines = text.split('\n')
+
+    new_lines = []
+
+    for i in range(len(lines)):
+
+        words = lines[i].split()
+
+        for j in range(len(words)-1):
+
+            if words[j] == '#include' and '"' in words[j+1]:
+
+                words[j+1] = '<' + words[j+1][1:-1] + '>'
+
+        if len(words) > 0:
+            new_lines.append(' '.join(words))
+
+    text = '\n'.join(new_lines)
+
+    clean_text = [text[0]]
+
+    in_comm = False
+    in_block_comm = False
+    in_str = False
+
+    for i in range(1, len(text)):
+
+        add_now = True
+
+        if text[i] == '"' and not (in_comm or in_block_comm):
+
+            if in_str:
+
+                in_str = False
+                add_now = False
+
+            else:
+                in_str = True
+
+        if text[i-1] == '/' and text[i] == '/' and \
+           not (in_str or in_block_comm or in_comm):
+
+            in_comm = True
+            clean_text = clean_text[:-1]
+
+        if text[i] == '\n' and in_comm:
+
+            in_comm = False
+
+        if text[i-1] == '/' and text[i] == '*' and \
+           not (in_str or in_block_comm or in_comm):
+
+            in_block_comm = True
+            clean_text = clean_text[:-1]
+
+        if text[i-1] == '*' and text[i] == '/' and in_block_comm:
+
+            in_block_comm = False
+            add_now = False
+
+        if not (in_comm or in_block_comm or in_str) and add_now:
+
+            clean_text.append(text[i])
+
+    return ''.join(clean_text)
+
+
+def generate_text(size):
+
+    # This function generates a C text of roughly the given size in bytes.
+
+    unit = '''#include "header_{0}.h"
+#include <stdio.h>
+
+/* Computes something
+   for index {0} */
+double function_{0}(double x, const char *name)
+{{
+    char quote = '"';  // a quote character
+    long scale = 1'000'000;  // digit separators
+    printf("value of %s: %f \\"{0}\\"\\n", name, x);
+    return x*{0}.0*scale + (double)quote;
+}}
+
+'''
+    parts = []
+    length = 0
+    i = 0
+
+    while length < size:
+
+        part = unit.format(i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+
+    return ''.join(parts)
+
+
+def measure(function, text):
+
+    start = time.perf_counter()
+    function(text)
+    elapsed = time.perf_counter() - start
+
+    return len(text)/(1024*1024*elapsed), elapsed
+
+
+size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4.0
+text = generate_text(int(size_mb*1024*1024))
+
+print('Text size: {:.2f} MB'.format(len(text)/(1024*1024)))
+
+new_throughput, new_time = measure(makemake_lib.remove_c_comments_and_strings, text)
+print('Tokenizer:          {:8.2f} MB/s ({:.3f} s)'.format(new_throughput, new_time))
+
+old_throughput, old_time = measure(legacy_clean_file_text, text)
+print('Per-character loop: {:8.2f} MB/s ({:.3f} s)'.format(old_throughput, old_time))
+
+print('Speedup: {:.1f}x'.format(new_throughput/old_throughput))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#
+# This program measures the time used for determining which C sources
+# implement and call the functions declared in the included headers, and
+# compares it with the original implementation that searched the text of
+# every source for every declared function.
+#
+# Usage:
+# benchmark_function_usage.py [<number of functions> ...]
+#
+import sys
+import os
+import io
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import makemake_lib
+import makemake_c
+
+functions_per_source = 50
+calls_per_function = 3
+
+
+def legacy_detect_function_usage(clean_text, functions):
+
+    # This is the implementation previously used by
+    # makemake_c.determine_object_dependencies, kept here for reference.
+
+    usage = {}
+
+    for function in functions:
+
+        func_splitted = clean_text.split(function + '(')
+
+        if len(func_splitted) < 2:
+            continue
+
+        is_producer = False
+        is_consumer = False
+
+        for substring in func_splitted[1:]:
+
+            paran_splitted = substring.split(')')
+
+            if len(paran_splitted) < 2:
+                continue
+
+            idx = 0
+
+            for element in paran_splitted:
+
+                if '(' in element:
+                    idx += 1
+                else:
+                    break
+
+            character_after = paran_splitted[idx+1].strip()
+            if len(character_after) > 0:
+                character_after = character_after[0]
+
+            if character_after == '{':
+                is_producer = True
+            else:
+                is_consumer = True
+
+        if is_producer and not is_consumer:
+            usage[function] = 'producer'
+
+        elif is_consumer and not is_producer:
+            usage[function] = 'consumer'
+
+    return usage
+
+
+def legacy_determine_object_dependencies(source_instances, header_instances, clean_texts):
+
+    # This is the remaining part of the original implementation, which
+    # builds the producers and consumers with nested loops.
+
+    header_source_dependencies = {}
+
+    for header in header_instances:
+
+        header_source_dependencies[header] = [source for source in source_instances
+                                              if header.filename in source.included_headers]
+
+    function_usage = {}
+
+    for source in source_instances:
+
+        functions = []
+
+        for header in header_instances:
+            if source in header_source_dependencies[header]:
+                functions += header.declared_functions
+
+        function_usage[source] = legacy_detect_function_usage(clean_texts[source], functions)
+
+    producer_consumer_dict = {}
+
+    for header in header_instances:
+
+        producer_consumer_dict[header] = {}
+
+        for function in header.declared_functions:
+
+            entry = {'producers': [], 'consumers': []}
+
+            for source in header_source_dependencies[header]:
+
+                usage = function_usage[source].get(function)
+
+                if usage == 'producer':
+                    entry['producers'].append(source)
+                elif usage == 'consumer':
+                    entry['consumers'].append(source)
+
+            producer_consumer_dict[header][function] = entry
+
+    object_dependencies = {}
+
+    for source in source_instances:
+
+        object_dependencies[source] = []
+
+        for header in header_instances:
+
+            for function in producer_consumer_dict[header]:
+
+                for consumer in producer_consumer_dict[header][function]['consumers']:
+
+                    if source is consumer:
+
+                        if len(producer_consumer_dict[header][function]['producers']) > 0:
+                            object_dependencies[source].append(
+                                producer_consumer_dict[header][function]['producers'][0])
+
+                        break
+
+        object_dependencies[source] = makemake_lib.remove_duplicates(object_dependencies[source])
+
+    return object_dependencies
+
+
+def generate_project(path, n_functions):
+
+    # This function writes a header declaring the given number of functions,
+    # and sources that each implement some of them and call functions
+    # implemented in other sources.
+
+    n_sources = max(1, n_functions//functions_per_source)
+
+    f = open(os.path.join(path, 'functions.h'), 'w')
+    f.write(''.join(['double function_{}(double x);\n'.format(i)
+                     for i in range(n_functions)]))
+    f.close()
+
+    for source_idx in range(n_sources):
+
+        lines = ['#include "functions.h"\n']
+
+        for i in range(source_idx*functions_per_source,
+                       min(n_functions, (source_idx + 1)*functions_per_source)):
+
+            calls = ' + '.join(['function_{}(x)'.format((i*7 + j*functions_per_source + 1) % n_functions)
+                                for j in range(calls_per_function)])
+
+            lines.append('double function_{}(double x)\n{{\n    return {};\n}}\n'.format(i, calls))
+
+        f = open(os.path.join(path, 'source_{}.c'.format(source_idx)), 'w')
+        f.write('\n'.join(lines))
+        f.close()
+
+    return ['source_{}.c'.format(source_idx) for source_idx in range(n_sources)]
+
+
+def measure(n_functions):
+
+    with tempfile.TemporaryDirectory() as path:
+
+        source_names = generate_project(path, n_functions)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+
+            start = time.perf_counter()
+            source_instances = [makemake_c.c_source(os.path.join(path, name))
+                                for name in source_names]
+            header_instances = [makemake_c.c_header(os.path.join(path, 'functions.h'))]
+            parse_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            new_dependencies = makemake_c.determine_object_dependencies(source_instances,
+                                                                        header_instances)
+            new_time = time.perf_counter() - start
+
+            clean_texts = {}
+
+            for source in source_instances:
+
+                f = open(source.filename_with_path, 'r')
+                text = makemake_lib.remove_c_comments_and_strings(f.read())
+                f.close()
+
+                clean_texts[source] = source.remove_preprocessor_directives(text)
+
+            start = time.perf_counter()
+            old_dependencies = legacy_determine_object_dependencies(source_instances,
+                                                                    header_instances,
+                                                                    clean_texts)
+            old_time = time.perf_counter() - start
+
+    if any(set(new_dependencies[source]) != set(old_dependencies[source])
+           for source in source_instances):
+        print('Warning: the implementations found different dependencies')
+
+    print('{:6d} functions, {:4d} sources: parsing {:7.3f} s, '
+          'symbol index {:7.3f} s, per-function search {:8.3f} s'
+          .format(n_functions, len(source_instances), parse_time, new_time, old_time))
+
+
+sizes = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2500, 5000, 10000]
+
+for n_functions in sizes:
+    measure(n_functions)
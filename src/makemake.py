@@ -34,6 +34,54 @@ Flags:
 -L <paths>:           Specifies search paths to use for input library files.
 -w:                   Generates a wrapper for all .mk files in the
                       directory.
+-j <number of jobs>:  Specifies the number of processes to use for parsing
+                      files (default is 1).
+--cache:              Stores parse results in .makemake_cache/ so that
+                      unchanged files are not parsed again.
+--incremental:        Enables the parse cache, reuses the dependencies of
+                      files not affected by changes since the previous run,
+                      lists the changed files and compile rules, and only
+                      rewrites the makefile if its content has changed.
+--combined:           Generates a single makefile for all the programs
+                      among the sources, compiling shared sources once.
+--batch:              Never asks for input. Missing headers are skipped,
+                      circular dependencies are resolved by dropping the
+                      dependency through the fewest modules/procedures,
+                      and existing makefiles are only replaced if they
+                      were generated for the same output, unless other
+                      policies are given with the flags below.
+--missing-headers <skip|fail>:
+                      Policy for headers that cannot be found.
+--cycles <drop|ignore|fail>:
+                      Policy for circular dependencies. "ignore" keeps all
+                      circular dependencies within a group of sources that
+                      depend on each other.
+--existing <overwrite|wrap|fail>:
+                      Policy for existing makefiles. "wrap" keeps makefiles
+                      for other outputs and generates a wrapper for them.
+--module-firewall:    (Fortran) Makes sources depend on stamp files that
+                      are only updated when the content of a module file
+                      changes, so that changes that do not affect the
+                      module interface do not recompile dependent sources.
+--depfiles:           (C/C++) Lets the compiler write the header
+                      dependencies of each object file to a .d file, which
+                      is included by the makefile.
+--build-dir:          Places object, module and output files in a separate
+                      directory for each configuration (build/default,
+                      build/debug, build/fast, build/lto and build/profile).
+--flag-signatures:    Recompiles the objects when the compilation command
+                      differs from the one they were last compiled with.
+--launcher <program>: Runs the compiler through the given program, e.g. a
+                      compiler cache like ccache or sccache.
+--launcher-cache <path>:
+                      Cache directory to use for ccache or sccache.
+--pch <number>:       (C/C++) Precompiles up to the given number of the
+                      headers that take the most time to parse in total.
+--unity <bytes>:      (C/C++) Compiles the sources in each directory
+                      together in batches of at most the given number of
+                      bytes of source text (0 for no limit).
+--non-recursive:      Generates makefile wrappers that build the outputs of
+                      all .mk files in a single make process.
 
 The S, H and L flags can be combined arbitrarily (e.g. -SH or -LSH).'''
           .format('<drive>:' if sys.platform == 'win32' else '', os.sep))
@@ -59,6 +107,62 @@ def abort_x_and_l():
     sys.exit(1)
 
 
+def abort_combined():
+
+    print('Error: --combined flag cannot be used with -x or -l flags')
+    sys.exit(1)
+
+
+def abort_depfiles():
+
+    print('Error: --depfiles flag is only supported for C and C++')
+    sys.exit(1)
+
+
+def abort_launcher_cache():
+
+    print('Error: --launcher-cache flag requires --launcher with one of {}'
+          .format(', '.join(sorted(makemake_lib.compiler_caches))))
+    sys.exit(1)
+
+
+def abort_pch(n_headers_string):
+
+    print('Error: invalid number of precompiled headers \"{}\"'.format(n_headers_string))
+    sys.exit(1)
+
+
+def abort_pch_language():
+
+    print('Error: --pch flag is only supported for C and C++')
+    sys.exit(1)
+
+
+def abort_unity(byte_budget_string):
+
+    print('Error: invalid number of bytes for unity batches \"{}\"'.format(byte_budget_string))
+    sys.exit(1)
+
+
+def abort_unity_language():
+
+    print('Error: --unity flag is only supported for C and C++')
+    sys.exit(1)
+
+
+def abort_policy(flag, policy, valid_policies):
+
+    print('Error: invalid policy \"{}\" for -{} flag (valid policies are {})'
+          .format(policy, flag, ', '.join(valid_policies)))
+    sys.exit(1)
+
+
+def abort_jobs(n_jobs):
+
+    print('Error: invalid number of jobs \"{}\"'.format(n_jobs))
+    sys.exit(1)
+
+
 def extract_flag_args(arg_list, valid_file_endings, n_flag_args):
 
     # This function finds the arguments following the flags
@@ -149,6 +253,22 @@ def separate_flags(flag_args, combinable_flags, incombinable_flags):
     return new_flag_args
 
 
+def get_policy(flag_args, flag, valid_policies, default_policy):
+
+    # This function returns the policy given with the specified flag, or
+    # the default policy if the flag is not present.
+
+    if flag not in flag_args:
+        return default_policy
+
+    policy = '' if len(flag_args[flag]) == 0 else flag_args[flag][0]
+
+    if policy not in valid_policies:
+        abort_policy(flag, policy, valid_policies)
+
+    return policy
+
+
 def detect_language(arg_list, source_endings):
 
     # This function checks the file endings of the arguments to
@@ -181,174 +301,292 @@ def convert_relative_paths(working_dir_path, paths):
         if paths[i][:2] == '.' + os.sep:
             paths[i] = os.path.join(working_dir_path, paths[i][2:])
 
-# Print usage if no arguments are provided
-if len(sys.argv) < 2:
-    abort_usage()
 
-arg_list = sys.argv[1:]
+def main():
+
+    # Print usage if no arguments are provided
+    if len(sys.argv) < 2:
+        abort_usage()
+
+    arg_list = sys.argv[1:]
+
+    # List of supported languages
+    languages = ['fortran', 'c', 'c++']
 
-# List of supported languages
-languages = ['fortran', 'c', 'c++']
+    # Lists of valid flags
+    combinable_flags = ['S', 'H', 'L']
+    incombinable_flags = ['c', 'x', 'l', 'w', 'j', '-cache', '-incremental', '-combined',
+                          '-batch', '-missing-headers', '-cycles', '-existing',
+                          '-module-firewall', '-depfiles', '-build-dir',
+                          '-flag-signatures', '-launcher', '-launcher-cache',
+                          '-pch', '-unity', '-non-recursive']
+    n_flag_args = {'c': 1, 'x': 1, 'l': 1, 'w': 0, 'j': 1, '-cache': 0, '-incremental': 0,
+                   '-combined': 0, '-batch': 0, '-missing-headers': 1, '-cycles': 1,
+                   '-existing': 1, '-module-firewall': 0, '-depfiles': 0,
+                   '-build-dir': 0, '-flag-signatures': 0, '-launcher': 1,
+                   '-launcher-cache': 1, '-pch': 1, '-unity': 1,
+                   '-non-recursive': 0}
 
-# Lists of valid flags
-combinable_flags = ['S', 'H', 'L']
-incombinable_flags = ['c', 'x', 'l', 'w']
-n_flag_args = {'c': 1, 'x': 1, 'l': 1, 'w': 0}
+    # Organize valid file endings
 
-# Organize valid file endings
+    source_endings = {'fortran': ['f90', 'f95', 'f03', 'f', 'for', 'F', 'F90'],
+                      'c': ['c'],
+                      'c++': ['C', 'cc', 'cpp', 'CPP', 'c++', 'cp', 'cxx']}
+    header_endings = {'fortran': ['h'],
+                      'c': ['h'],
+                      'c++': ['h', 'H', 'hh', 'hpp', 'tcc']}
+    library_endings = {'fortran': ['a', 'so'],
+                       'c': ['a', 'so'],
+                       'c++': ['a', 'so']}
 
-source_endings = {'fortran': ['f90', 'f95', 'f03', 'f', 'for', 'F', 'F90'],
-                  'c': ['c'],
-                  'c++': ['C', 'cc', 'cpp', 'CPP', 'c++', 'cp', 'cxx']}
-header_endings = {'fortran': ['h'],
-                  'c': ['h'],
-                  'c++': ['h', 'H', 'hh', 'hpp', 'tcc']}
-library_endings = {'fortran': ['a', 'so'],
-                   'c': ['a', 'so'],
-                   'c++': ['a', 'so']}
+    valid_endings = {language: source_endings[language] +
+                               header_endings[language] +
+                               library_endings[language]
+                     for language in languages}
 
-valid_endings = {language: source_endings[language] +
-                           header_endings[language] +
-                           library_endings[language]
-                 for language in languages}
+    all_valid_endings = sum(valid_endings.values(), [])
 
-all_valid_endings = sum(valid_endings.values(), [])
+    # Get path to the directory this script was run from
+    working_dir_path = os.getcwd()
 
-# Get path to the directory this script was run from
-working_dir_path = os.getcwd()
+    # Extract flag arguments
 
-# Extract flag arguments
+    flag_args_combined = extract_flag_args(arg_list, all_valid_endings, n_flag_args)
+    flag_args = separate_flags(flag_args_combined,
+                               combinable_flags,
+                               incombinable_flags)
 
-flag_args_combined = extract_flag_args(arg_list, all_valid_endings, n_flag_args)
-flag_args = separate_flags(flag_args_combined,
-                           combinable_flags,
-                           incombinable_flags)
+    compiler = False if 'c' not in flag_args else flag_args['c'][0]
+    executable = False if 'x' not in flag_args else flag_args['x'][0]
+    library = False if 'l' not in flag_args else flag_args['l'][0]
+    source_paths = [] if 'S' not in flag_args else \
+                   makemake_lib.remove_duplicates(flag_args['S'])
+    header_paths = [] if 'H' not in flag_args else \
+                   makemake_lib.remove_duplicates(flag_args['H'])
+    library_paths = [] if 'L' not in flag_args else flag_args['L']
+    generate_wrapper = 'w' in flag_args
+    use_cache = '-cache' in flag_args
+    incremental = '-incremental' in flag_args
+    combined = '-combined' in flag_args
+    batch = '-batch' in flag_args
+    module_firewall = '-module-firewall' in flag_args
+    use_depfiles = '-depfiles' in flag_args
+    non_recursive_wrapper = '-non-recursive' in flag_args
+    build_directory = '-build-dir' in flag_args
+    flag_signatures = '-flag-signatures' in flag_args
+    launcher = False if '-launcher' not in flag_args else flag_args['-launcher'][0]
+    launcher_cache = None if '-launcher-cache' not in flag_args else \
+                     flag_args['-launcher-cache'][0]
 
-compiler = False if 'c' not in flag_args else flag_args['c'][0]
-executable = False if 'x' not in flag_args else flag_args['x'][0]
-library = False if 'l' not in flag_args else flag_args['l'][0]
-source_paths = [] if 'S' not in flag_args else \
-               makemake_lib.remove_duplicates(flag_args['S'])
-header_paths = [] if 'H' not in flag_args else \
-               makemake_lib.remove_duplicates(flag_args['H'])
-library_paths = [] if 'L' not in flag_args else flag_args['L']
-generate_wrapper = 'w' in flag_args
+    missing_header_policy = get_policy(flag_args, '-missing-headers', ['skip', 'fail'],
+                                       'skip' if batch else None)
+    cycle_policy = get_policy(flag_args, '-cycles', ['drop', 'ignore', 'fail'],
+                              'drop' if batch else None)
+    existing_makefile_policy = get_policy(flag_args, '-existing', ['overwrite', 'wrap', 'fail'],
+                                          'fail' if batch else None)
 
-if executable and library:
-    abort_x_and_l()
+    if 'j' in flag_args:
 
-# Convert any relative paths to absolute paths
-convert_relative_paths(working_dir_path, source_paths)
-convert_relative_paths(working_dir_path, header_paths)
-convert_relative_paths(working_dir_path, library_paths)
+        n_jobs_string = '' if len(flag_args['j']) == 0 else flag_args['j'][0]
 
-# Find used language
-language = detect_language(arg_list, source_endings)
+        if not n_jobs_string.isdigit() or int(n_jobs_string) < 1:
+            abort_jobs(n_jobs_string)
 
-if language not in languages and not generate_wrapper:
-    abort_language()
+        n_jobs = int(n_jobs_string)
 
-if library:
+    else:
+        n_jobs = 1
 
-    dot_splitted = library.split('.')
-    ending = '<no ending>' if len(dot_splitted) == 0 else dot_splitted[-1]
+    if '-pch' in flag_args:
 
-    if ending not in library_endings[language]:
-        abort_ending(library)
+        n_headers_string = '' if len(flag_args['-pch']) == 0 else flag_args['-pch'][0]
 
-if language in languages:
+        if not n_headers_string.isdigit() or int(n_headers_string) < 1:
+            abort_pch(n_headers_string)
 
-    # Extract file arguments
+        precompiled_headers = int(n_headers_string)
 
-    source_files = []
-    header_files = []
-    library_files = []
+    else:
+        precompiled_headers = 0
 
-    for filename in arg_list:
+    if '-unity' in flag_args:
+
+        byte_budget_string = '' if len(flag_args['-unity']) == 0 else flag_args['-unity'][0]
+
+        if not byte_budget_string.isdigit():
+            abort_unity(byte_budget_string)
 
-        ending = filename.split('.')[-1]
+        unity_budget = int(byte_budget_string)
 
-        if ending in source_endings[language]:
-            source_files.append(filename)
-        elif ending in header_endings[language]:
-            header_files.append(filename)
-        elif ending in library_endings[language]:
-            library_files.append(filename)
-        else:
-            abort_ending(filename)
+    else:
+        unity_budget = None
 
-    # Run relevant makefile generator
+    if executable and library:
+        abort_x_and_l()
 
-    if language == 'fortran':
+    if combined and (executable or library):
+        abort_combined()
 
-        import makemake_f
+    if launcher_cache is not None and \
+       (not launcher or os.path.basename(launcher) not in makemake_lib.compiler_caches):
+        abort_launcher_cache()
 
-        print('\nCollecting files...')
+    # Convert any relative paths to absolute paths
+    convert_relative_paths(working_dir_path, source_paths)
+    convert_relative_paths(working_dir_path, header_paths)
+    convert_relative_paths(working_dir_path, library_paths)
 
-        manager = makemake_lib.file_manager(working_dir_path,
-                                            source_paths,
-                                            header_paths,
-                                            library_paths,
-                                            source_files,
-                                            header_files,
-                                            library_files,
-                                            makemake_f.fortran_source,
-                                            makemake_f.fortran_header,
-                                            compiler,
-                                            executable,
-                                            library)
+    if launcher_cache is not None:
+        launcher_cache_paths = [launcher_cache]
+        convert_relative_paths(working_dir_path, launcher_cache_paths)
+        launcher_cache = launcher_cache_paths[0]
 
-        for sources in manager.source_containers:
-            makemake_f.generate_makefile(manager, sources)
+    # Find used language
+    language = detect_language(arg_list, source_endings)
 
-    elif language == 'c':
+    if language not in languages and not generate_wrapper:
+        abort_language()
 
-        import makemake_c
+    if use_depfiles and language == 'fortran':
+        abort_depfiles()
 
-        print('\nCollecting files...')
+    if precompiled_headers and language == 'fortran':
+        abort_pch_language()
 
-        manager = makemake_lib.file_manager(working_dir_path,
-                                            source_paths,
-                                            header_paths,
-                                            library_paths,
-                                            source_files,
-                                            header_files,
-                                            library_files,
-                                            makemake_c.c_source,
-                                            makemake_c.c_header,
-                                            compiler,
-                                            executable,
-                                            library)
+    if unity_budget is not None and language == 'fortran':
+        abort_unity_language()
 
-        for sources in manager.source_containers:
-            makemake_c.generate_makefile(manager, sources)
+    if library:
 
-    elif language == 'c++':
+        dot_splitted = library.split('.')
+        ending = '<no ending>' if len(dot_splitted) == 0 else dot_splitted[-1]
 
-        raise NotImplementedError
+        if ending not in library_endings[language]:
+            abort_ending(library)
 
-        import makemake_cpp
+    if language in languages:
 
-        print('\nCollecting files...')
+        # Extract file arguments
 
-        manager = makemake_lib.file_manager(working_dir_path,
-                                            source_paths,
-                                            header_paths,
-                                            library_paths,
-                                            source_files,
-                                            header_files,
-                                            library_files,
-                                            makemake_cpp.cpp_source,
-                                            makemake_cpp.cpp_header,
-                                            compiler,
-                                            executable,
-                                            library)
+        source_files = []
+        header_files = []
+        library_files = []
 
-        for sources in manager.source_containers:
-            makemake_cpp.generate_makefile(manager, sources)
+        for filename in arg_list:
 
-if generate_wrapper:
+            ending = filename.split('.')[-1]
 
-    # Run function for generating a makefile wrapper
-    writer = makemake_lib.file_writer(working_dir_path)
-    writer.generate_wrapper()
+            if ending in source_endings[language]:
+                source_files.append(filename)
+            elif ending in header_endings[language]:
+                header_files.append(filename)
+            elif ending in library_endings[language]:
+                library_files.append(filename)
+            else:
+                abort_ending(filename)
+
+        # Options of the file manager that are the same for all languages
+        manager_options = {'use_cache': use_cache,
+                           'n_jobs': n_jobs,
+                           'incremental': incremental,
+                           'combined': combined,
+                           'missing_header_policy': missing_header_policy,
+                           'cycle_policy': cycle_policy,
+                           'existing_makefile_policy': existing_makefile_policy,
+                           'module_firewall': module_firewall,
+                           'use_depfiles': use_depfiles,
+                           'build_directory': build_directory,
+                           'flag_signatures': flag_signatures,
+                           'launcher': launcher,
+                           'launcher_cache': launcher_cache,
+                           'precompiled_headers': precompiled_headers,
+                           'unity_budget': unity_budget,
+                           'non_recursive_wrapper': non_recursive_wrapper}
+
+        # Run relevant makefile generator
+
+        if language == 'fortran':
+
+            import makemake_f
+
+            print('\nCollecting files...')
+
+            manager = makemake_lib.file_manager(working_dir_path,
+                                                source_paths,
+                                                header_paths,
+                                                library_paths,
+                                                source_files,
+                                                header_files,
+                                                library_files,
+                                                makemake_f.fortran_source,
+                                                makemake_f.fortran_header,
+                                                compiler,
+                                                executable,
+                                                library,
+                                                **manager_options)
+
+            for sources in manager.source_containers:
+                makemake_f.generate_makefile(manager, sources)
+
+        elif language == 'c':
+
+            import makemake_c
+
+            print('\nCollecting files...')
+
+            manager = makemake_lib.file_manager(working_dir_path,
+                                                source_paths,
+                                                header_paths,
+                                                library_paths,
+                                                source_files,
+                                                header_files,
+                                                library_files,
+                                                makemake_c.c_source,
+                                                makemake_c.c_header,
+                                                compiler,
+                                                executable,
+                                                library,
+                                                **manager_options)
+
+            for sources in manager.source_containers:
+                makemake_c.generate_makefile(manager, sources)
+
+        elif language == 'c++':
+
+            raise NotImplementedError
+
+            import makemake_cpp
+
+            print('\nCollecting files...')
+
+            manager = makemake_lib.file_manager(working_dir_path,
+                                                source_paths,
+                                                header_paths,
+                                                library_paths,
+                                                source_files,
+                                                header_files,
+                                                library_files,
+                                                makemake_cpp.cpp_source,
+                                                makemake_cpp.cpp_header,
+                                                compiler,
+                                                executable,
+                                                library,
+                                                **manager_options)
+
+            for sources in manager.source_containers:
+                makemake_cpp.generate_makefile(manager, sources)
+
+        if manager.state is not None:
+            manager.state.save()
+
+    if generate_wrapper:
+
+        # Run function for generating a makefile wrapper
+        writer = makemake_lib.file_writer(working_dir_path,
+                                          policy=existing_makefile_policy,
+                                          non_recursive_wrapper=non_recursive_wrapper)
+        writer.generate_wrapper()
+
+
+if __name__ == '__main__':
+    main()
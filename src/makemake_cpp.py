@@ -17,7 +17,16 @@ class cpp_source:
     # This class extracts relevant information from a C++ source
     # file and stores it in class attributes.
 
-    def __init__(self, filename_with_path, is_header=False):
+    # Must be incremented whenever the content of the parse results changes
+    parser_version = 4
+
+    # Other object files are regular prerequisites of the compile rule
+    order_only_object_dependencies = False
+
+    # Language to specify when precompiling headers
+    precompiled_header_language = 'c++-header'
+
+    def __init__(self, filename_with_path, is_header=False, parse_results=None):
 
         self.std_headers = ['cstdlib',
                             'csignal',
@@ -170,24 +179,31 @@ class cpp_source:
         self.name = '.'.join(self.filename.split('.')[:-1])
         self.object_name = self.name + '.o'
 
-        print('Parsing... ', end='')
+        if parse_results is None:
 
-        f = open(filename_with_path, 'r')
-        self.text = f.read()
-        f.close()
+            print('Parsing... ', end='')
+            parse_results = self.parse_file(is_header)
+
+        else:
+            print('Using existing parse results... ', end='')
 
-        no_strings_text = self.clean_file_text()
+        self.parse_results = parse_results
 
-        self.is_main, self.included_headers, \
-            self.internal_libraries = self.get_included_headers(no_strings_text)
+        self.is_main = parse_results['is_main']
+        self.included_headers = list(parse_results['included_headers'])
+        self.internal_libraries = dict(parse_results['internal_libraries'])
 
         self.executable_name = self.name + ('.exe' if sys.platform == 'win32' else '.x')
 
-        self.clean_text = self.remove_preprocessor_directives(no_strings_text)
+        if not is_header:
+            self.function_usage = dict(parse_results['function_usage'])
+            self.file_scope_names = list(parse_results['file_scope_names'])
+            self.configures_headers = parse_results['configures_headers']
 
         if is_header:
-            self.declared_classes, no_class_text = self.extract_declared_classes(self.clean_text)
-            self.declared_functions = self.get_declared_functions(no_class_text)
+            self.declared_classes = {class_name: list(methods) for class_name, methods
+                                     in parse_results['declared_classes'].items()}
+            self.declared_functions = list(parse_results['declared_functions'])
             self.declared_methods = []
 
             for class_name in self.declared_classes:
@@ -233,90 +249,76 @@ class cpp_source:
         if self.internal_libraries['openmp']:
             print('Uses OpenMP')
 
-        # Compilation rule for the makefile
-        self.compile_rule_declr = '\n\n{}\n{}: {} '\
-                                  .format('# Rule for compiling ' + self.filename,
-                                          self.object_name,
-                                          filename_with_path.replace(' ', '\ '))
-
-        self.compile_rule = '\n\t$(COMPILER) -c $(EXTRA_FLAGS) $(COMPILATION_FLAGS) ' + \
-            '$(HEADER_PATH_FLAGS) \"{}\"'.format(filename_with_path)
-
-    def clean_file_text(self):
-
-        # This function removes non-executable code like comments and strings
-        # from the source text.
-
-        lines = self.text.split('\n')
-
-        # Go through text and make sure all included header file names are
-        # surrounded by angled brackets, so they are not confused with strings.
-
-        new_lines = []
-
-        for i in range(len(lines)):
-
-            words = lines[i].split()
+        self.create_compile_rule()
 
-            for j in range(len(words)-1):
+    def create_compile_rule(self, use_build_directory=False, precompiled_header=None):
 
-                if words[j] in ['#include', '#import'] and '"' in words[j+1]:
+        # This method creates the compilation rule for the makefile. If a
+        # build directory is used, the object file is written to the
+        # directory for the current configuration. If the path of a
+        # precompiled header wrapper is given, the wrapper is included
+        # before the content of the source, and the object depends on the
+        # precompiled header.
 
-                    words[j+1] = '<' + words[j+1][1:-1] + '>'
+        object_path = makemake_lib.get_object_path(self.object_name, use_build_directory)
+        output_text = ' -o {}'.format(object_path) if use_build_directory else ''
 
-            if len(words) > 0:
-                new_lines.append(' '.join(words))
+        if precompiled_header is not None:
+            header_prerequisite = ' ' + precompiled_header + '.gch'
+            header_text = '-include {} -Winvalid-pch '.format(precompiled_header)
+        else:
+            header_prerequisite = ''
+            header_text = ''
 
-        text = '\n'.join(new_lines)
-
-        clean_text = [text[0]]
-
-        # Go through text again and remove all strings and comments
-
-        in_comm = False
-        in_block_comm = False
-        in_str = False
-
-        for i in range(1, len(text)):
-
-            add_now = True
-
-            if text[i] == '"' and not (in_comm or in_block_comm):
+        # Compilation rule for the makefile
+        self.compile_rule_declr = '\n\n{}\n{}: {}{} '\
+                                  .format('# Rule for compiling ' + self.filename,
+                                          object_path,
+                                          self.filename_with_path.replace(' ', '\ '),
+                                          header_prerequisite)
 
-                if in_str:
+        self.compile_rule = '\n\t$(COMPILER) -c $(EXTRA_FLAGS) $(COMPILATION_FLAGS) ' + \
+            '$(HEADER_PATH_FLAGS) {}\"{}\"{}'.format(header_text, self.filename_with_path, output_text)
 
-                    in_str = False
-                    add_now = False
+    def parse_file(self, is_header):
 
-                else:
-                    in_str = True
+        # This function reads the source file and returns a dictionary
+        # with the information extracted from it.
 
-            if text[i-1] == '/' and text[i] == '/' and \
-               not (in_str or in_block_comm or in_comm):
+        f = open(self.filename_with_path, 'r')
+        text = f.read()
+        f.close()
 
-                in_comm = True
-                clean_text = clean_text[:-1]
+        no_strings_text = self.clean_file_text(text)
 
-            if text[i] == '\n' and in_comm:
+        is_main, included_headers, \
+            internal_libraries = self.get_included_headers(no_strings_text)
 
-                in_comm = False
+        clean_text = self.remove_preprocessor_directives(no_strings_text)
 
-            if text[i-1] == '/' and text[i] == '*' and \
-               not (in_str or in_block_comm or in_comm):
+        parse_results = {'is_main': is_main,
+                         'included_headers': included_headers,
+                         'internal_libraries': internal_libraries}
 
-                in_block_comm = True
-                clean_text = clean_text[:-1]
+        if not is_header:
+            parse_results['function_usage'] = \
+                makemake_lib.find_function_usage(clean_text, ['{', ':'])
+            parse_results['file_scope_names'], parse_results['configures_headers'] = \
+                makemake_lib.find_file_scope_names(no_strings_text, clean_text)
 
-            if text[i-1] == '*' and text[i] == '/' and in_block_comm:
+        if is_header:
+            declared_classes, no_class_text = self.extract_declared_classes(clean_text)
+            parse_results['declared_classes'] = declared_classes
+            parse_results['declared_functions'] = self.get_declared_functions(no_class_text)
 
-                in_block_comm = False
-                add_now = False
+        return parse_results
 
-            if not (in_comm or in_block_comm or in_str) and add_now:
+    def clean_file_text(self, text):
 
-                clean_text.append(text[i])
+        # This function removes non-executable code like comments and strings
+        # from the source text.
 
-        return ''.join(clean_text)
+        return makemake_lib.remove_c_comments_and_strings(text)
 
     def get_included_headers(self, text):
 
@@ -535,12 +537,29 @@ class cpp_source:
                     'included indirectly through {}'\
                     .format(header.filename)
 
+    def get_provided_names(self):
+
+        # This function returns the names of the functions that the source
+        # implements, which other sources can depend on it for.
+
+        return [function for function in self.function_usage
+                if self.function_usage[function] == 'producer']
+
+    def get_used_names(self):
+
+        # This function returns the names of the functions that the source
+        # calls without implementing them.
+
+        return [function for function in self.function_usage
+                if self.function_usage[function] != 'producer']
+
 
 class cpp_header(cpp_source):
 
-    def __init__(self, filename_with_path):
+    def __init__(self, filename_with_path, parse_results=None):
 
-        super().__init__(filename_with_path, is_header=True)
+        super().__init__(filename_with_path, is_header=True,
+                         parse_results=parse_results)
 
 
 def generate_makefile(manager, sources):
@@ -554,18 +573,45 @@ def generate_makefile(manager, sources):
     elif manager.library:
         print('\nGenerating makefile for library \"{}\"...\n'
               .format(manager.library))
+    elif sources.program_sources is not None:
+        print('\nGenerating combined makefile for executables {}...\n'
+              .format(', '.join(['\"{}\"'.format(program_source.executable_name)
+                                 for program_source in sources.program_sources])))
     else:
         print('\nGenerating makefile for executable \"{}\"...\n'
               .format(sources.program_source.executable_name))
 
     # Get information from files
 
+    if manager.state is not None:
+        sources.use_previous_edges(manager.state,
+                                   makemake_lib.get_pure_output_name(manager, sources))
+
     sources.determine_header_dependencies()
 
     object_dependencies = determine_object_dependencies(sources.source_instances,
-                                                        sources.header_instances)
+                                                        sources.header_instances,
+                                                        sources.find_reusable_object_dependencies())
+
+    dependency_text = sources.process_dependencies(object_dependencies,
+                                                   cycle_policy=manager.cycle_policy)
+
+    if manager.unity_budget is not None:
+        sources.form_unity_batches(manager.unity_budget)
+
+    if manager.precompiled_headers:
+        sources.select_precompiled_headers(manager.precompiled_headers)
 
-    dependency_text = sources.process_dependencies(object_dependencies)
+    if manager.build_directory or manager.precompiled_headers:
+
+        for source in sources.reduced_source_instances:
+
+            header = sources.precompiled_headers.get(source) if manager.precompiled_headers else None
+
+            source.create_compile_rule(use_build_directory=manager.build_directory,
+                                       precompiled_header=None if header is None else
+                                       makemake_lib.get_precompiled_header_path(header,
+                                                                                manager.build_directory))
 
     print('\nGenerating makefile text... ', end='')
 
@@ -573,12 +619,16 @@ def generate_makefile(manager, sources):
         output_name, object_files, compilation_flags, \
         linking_flags, header_path_flags, library_link_flags, \
         library_path_flags, debug_flags, fast_flags, \
+        pgo_instrument_flags, pgo_use_flags, lto_flags, lto_archiver, \
         compile_rule_string, delete_cmd, delete_trail, \
         help_text = makemake_lib.get_common_makefile_parameters(manager,
                                                                 sources,
                                                                 'g++',
                                                                 'mpicxx')
 
+    optional_variables = makemake_lib.get_optional_variables(manager)
+    pgo_rules = makemake_lib.get_pgo_rules()
+
     # Create makefile
     if manager.library and not manager.library_is_shared:
 
@@ -595,6 +645,7 @@ def generate_makefile(manager, sources):
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -608,10 +659,14 @@ OBJECT_FILES = {}
 COMPILATION_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
-HEADER_PATH_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
+ARCHIVER = ar
+LTO_ARCHIVER = {}
+HEADER_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags clean help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags clean help
 
 # Define default target group
 all: $(LIBRARY)
@@ -619,6 +674,7 @@ all: $(LIBRARY)
 # Define optional target groups
 debug: set_debug_flags $(LIBRARY)
 fast: set_fast_flags $(LIBRARY)
+lto: set_lto_flags $(LIBRARY)
 
 # Defines appropriate compiler flags for debugging
 set_debug_flags:
@@ -628,9 +684,14 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval ARCHIVER = $(LTO_ARCHIVER))
+
 # Rule for linking object files
 $(LIBRARY): $(OBJECT_FILES)
-\tar rcs $(LIBRARY) $(OBJECT_FILES){}
+\t$(ARCHIVER) rcs $(LIBRARY) $(OBJECT_FILES){}
 
 # Action for removing all auxiliary files
 clean:
@@ -647,7 +708,10 @@ help:
             compilation_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
+            lto_archiver,
             header_path_flags,
+            optional_variables,
             compile_rule_string,
             delete_cmd,
             delete_trail,
@@ -668,6 +732,7 @@ help:
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -682,12 +747,14 @@ COMPILATION_FLAGS = {}
 LINKING_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
 HEADER_PATH_FLAGS = {}
 LIBRARY_LINKING_FLAGS = {}
-LIBRARY_PATH_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags clean help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags clean help
 
 # Define default target group
 all: $(LIBRARY)
@@ -695,6 +762,7 @@ all: $(LIBRARY)
 # Define optional target groups
 debug: set_debug_flags $(LIBRARY)
 fast: set_fast_flags $(LIBRARY)
+lto: set_lto_flags $(LIBRARY)
 
 # Defines appropriate compiler flags for debugging
 set_debug_flags:
@@ -704,6 +772,11 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
 # Rule for linking object files
 $(LIBRARY): $(OBJECT_FILES)
 \t$(COMPILER) $(EXTRA_FLAGS) $(LINKING_FLAGS) $(OBJECT_FILES) $(LIBRARY_PATH_FLAGS) $(LIBRARY_LINKING_FLAGS) -o $(LIBRARY){}
@@ -724,12 +797,132 @@ help:
             linking_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
+            header_path_flags,
+            library_link_flags,
+            library_path_flags,
+            optional_variables,
+            compile_rule_string,
+            delete_cmd,
+            delete_trail,
+            help_text)
+
+    elif sources.program_sources is not None:
+
+        # Multiple executables
+
+        program_variables, link_rules = \
+            makemake_lib.get_program_link_rules(sources, use_build_directory=manager.build_directory)
+
+        makefile = '''#@{}
+# This makefile was generated by makemake.py ({}).
+# GitHub repository: https://github.com/lars-frogner/makemake.py
+#
+# Usage:
+# make <argument 1> <argument 2> ...
+#
+# Arguments:
+# <none>:  Compiles with no compiler flags.
+# debug:   Compiles with flags useful for debugging.
+# fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
+# profile: Compiles with flags for profiling.
+# gprof:   Displays the profiling results with gprof.
+# pgo-instrument: Compiles with instrumentation for profile-guided optimization.
+# pgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.
+# pgo:     Compiles with optimizations guided by the training runs.
+# clean:   Deletes auxiliary files.
+# help:    Displays this help text.
+#
+# To compile with additional flags, add the argument
+# EXTRA_FLAGS="<flags>"
+#
+# To build a single executable, give its name as an argument. gprof
+# uses the first executable unless EXECUTABLE=<name> is added.
+
+# Define variables
+COMPILER = {}
+EXECUTABLES = {}
+EXECUTABLE = $(firstword $(EXECUTABLES))
+OBJECT_FILES = {}{}
+COMPILATION_FLAGS = {}
+LINKING_FLAGS = {}
+DEBUGGING_FLAGS = {}
+PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
+PROFILING_FLAGS = -pg
+PGO_INSTRUMENT_FLAGS = {}
+PGO_USE_FLAGS = {}
+PGO_DIR = pgo
+MAKEFILE_PATH := $(abspath $(firstword $(MAKEFILE_LIST)))
+HEADER_PATH_FLAGS = {}
+LIBRARY_LINKING_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
+
+# Make sure certain rules are not activated by the presence of files
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags set_profile_flags clean gprof pgo-instrument pgo-train pgo help
+
+# Define default target group
+all: $(EXECUTABLES)
+
+# Define optional target groups
+debug: set_debug_flags $(EXECUTABLES)
+fast: set_fast_flags $(EXECUTABLES)
+lto: set_lto_flags $(EXECUTABLES)
+profile: set_profile_flags $(EXECUTABLES)
+
+# Defines appropriate compiler flags for debugging
+set_debug_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(DEBUGGING_FLAGS))
+
+# Defines appropriate compiler flags for high performance
+set_fast_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
+
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
+# Defines appropriate compiler flags for profiling
+set_profile_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PROFILING_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PROFILING_FLAGS)){}{}
+
+# Action for removing all auxiliary files
+clean:
+\t{} $(OBJECT_FILES){}
+
+# Action for reading profiling results
+gprof:
+\tgprof $(EXECUTABLE){}
+
+# Action for printing help text
+help:
+\t@echo {}''' \
+    .format(pure_output_name,
+            current_time,
+            compiler,
+            output_name,
+            object_files,
+            program_variables,
+            compilation_flags,
+            linking_flags,
+            debug_flags,
+            fast_flags,
+            lto_flags,
+            pgo_instrument_flags,
+            pgo_use_flags,
             header_path_flags,
             library_link_flags,
             library_path_flags,
+            optional_variables,
+            link_rules,
             compile_rule_string,
             delete_cmd,
             delete_trail,
+            pgo_rules,
             help_text)
 
     else:
@@ -747,8 +940,12 @@ help:
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # profile: Compiles with flags for profiling.
 # gprof:   Displays the profiling results with gprof.
+# pgo-instrument: Compiles with instrumentation for profile-guided optimization.
+# pgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.
+# pgo:     Compiles with optimizations guided by the training runs.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -763,13 +960,19 @@ COMPILATION_FLAGS = {}
 LINKING_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
 PROFILING_FLAGS = -pg
+PGO_INSTRUMENT_FLAGS = {}
+PGO_USE_FLAGS = {}
+PGO_DIR = pgo
+MAKEFILE_PATH := $(abspath $(firstword $(MAKEFILE_LIST)))
 HEADER_PATH_FLAGS = {}
 LIBRARY_LINKING_FLAGS = {}
-LIBRARY_PATH_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags set_profile_flags clean gprof help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags set_profile_flags clean gprof pgo-instrument pgo-train pgo help
 
 # Define default target group
 all: $(EXECUTABLE)
@@ -777,6 +980,7 @@ all: $(EXECUTABLE)
 # Define optional target groups
 debug: set_debug_flags $(EXECUTABLE)
 fast: set_fast_flags $(EXECUTABLE)
+lto: set_lto_flags $(EXECUTABLE)
 profile: set_profile_flags $(EXECUTABLE)
 
 # Defines appropriate compiler flags for debugging
@@ -787,6 +991,11 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
 # Defines appropriate compiler flags for profiling
 set_profile_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PROFILING_FLAGS))
@@ -802,7 +1011,7 @@ clean:
 
 # Action for reading profiling results
 gprof:
-\tgprof $(EXECUTABLE)
+\tgprof $(EXECUTABLE){}
 
 # Action for printing help text
 help:
@@ -816,20 +1025,31 @@ help:
             linking_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
+            pgo_instrument_flags,
+            pgo_use_flags,
             header_path_flags,
             library_link_flags,
             library_path_flags,
+            optional_variables,
             compile_rule_string,
             delete_cmd,
             delete_trail,
+            pgo_rules,
             help_text)
 
     print('Done')
 
     print(dependency_text)
 
-    writer = makemake_lib.file_writer(manager.working_dir_path)
-    writer.save_makefile(makefile, pure_output_name)
+    if manager.state is not None:
+        manager.state.update_output(pure_output_name, sources)
+
+    writer = makemake_lib.file_writer(manager.working_dir_path,
+                                      policy=manager.existing_makefile_policy,
+                                      non_recursive_wrapper=manager.non_recursive_wrapper)
+    writer.save_makefile(makefile, pure_output_name,
+                         incremental=manager.state is not None)
 
 
 def abort_multiple_producers(function):
@@ -838,146 +1058,149 @@ def abort_multiple_producers(function):
     sys.exit(1)
 
 
-def determine_object_dependencies(source_instances, header_instances):
+def determine_object_dependencies(source_instances, header_instances, reused_dependencies=None):
 
     # This function creates a dictionary with the cpp_source instances
     # as keys. The values are lists of cpp_source instances for the other
-    # sources that implement functions that the source uses.
-
-    print('Determining object dependencies...', end='')
+    # sources that implement functions that the source uses. The
+    # dependencies of the sources in the given dictionary of reused
+    # dependencies are taken from it, together with their descriptions.
 
-    # Create a dictionary of all headers containing the sources that
-    # include each header.
+    if reused_dependencies is None:
+        reused_dependencies = {}
 
-    header_source_dependencies = {}
+    print('Determining object dependencies...', end='')
 
-    for header in header_instances:
+    # Create a dictionary of the headers with each filename
 
-        header_source_dependencies[header] = []
+    headers_by_filename = {}
 
-        for source in source_instances:
+    for header_idx, header in enumerate(header_instances):
+        headers_by_filename.setdefault(header.filename, []).append(header_idx)
 
-            if header.filename in source.included_headers:
-                header_source_dependencies[header].append(source)
+    # Create a dictionary for each header with the position of each
+    # function it declares
 
-    # Create a dictionary of headers containing the functions that each
-    # header declares. Each function is a key to a dictionary containing
-    # a list of the sources that implement the function ("producers")
-    # and a list of the sources that call the function ("consumers").
-
-    producer_consumer_dict = {}
+    declared_function_positions = []
 
     for header in header_instances:
 
-        producer_consumer_dict[header] = {}
-
-        for function in header.declared_functions + header.declared_methods:
+        positions = {}
 
-            producer_consumer_dict[header][function] = {}
-            producer_consumer_dict[header][function]['producers'] = []
-            producer_consumer_dict[header][function]['consumers'] = []
+        for function_idx, function in enumerate(header.declared_functions + header.declared_methods):
+            positions.setdefault(function, function_idx)
 
-            for source in header_source_dependencies[header]:
+        declared_function_positions.append(positions)
 
-                text = re.sub(r'\s*::\s*', '::', source.clean_text)
+    # Use the function usage found when each source was parsed to create
+    # a dictionary of the sources implementing each function declared in
+    # an included header ("producers"), and a list for each source of the
+    # functions declared in included headers that it calls ("consumers").
+    # The functions are identified by the position of the header and the
+    # position of the function in the header.
 
-                # Split source text at the function name
-                func_splitted = text.split(function + '(')
+    # When dependencies are reused, only the implementations of the
+    # functions used or implemented by the remaining sources are needed
+    # from the sources they are reused for.
 
-                if len(func_splitted) < 2:
-                    continue
+    if len(reused_dependencies) > 0:
 
-                is_producer = False
-                is_consumer = False
+        relevant_functions = set()
 
-                # Loop through all substrings following a function name
-                for substring in func_splitted[1:]:
+        for source in source_instances:
+            if source not in reused_dependencies:
+                relevant_functions.update(source.function_usage)
 
-                    # Find the character following the parantheses after the
-                    # function name.
+    producers = {}
+    consumed_functions = {}
 
-                    paran_splitted = substring.split(')')
+    for source in source_instances:
 
-                    if len(paran_splitted) < 2:
-                        continue
+        consumed_functions[source] = []
 
-                    idx = 0
+        if source in reused_dependencies:
 
-                    for element in paran_splitted:
+            function_usage = {function: source.function_usage[function]
+                              for function in source.function_usage
+                              if function in relevant_functions and
+                              source.function_usage[function] == 'producer'}
 
-                        if '(' in element:
-                            idx += 1
-                        else:
-                            break
+            if len(function_usage) == 0:
+                continue
 
-                    character_after = paran_splitted[idx+1].strip()
-                    if len(character_after) > 0:
-                        character_after = character_after[0]
+        else:
+            function_usage = source.function_usage
 
-                    # If the next character is a curly bracket or colon, the function is implmented
-                    if character_after in ['{', ':']:
+        header_indices = []
 
-                        is_producer = True
+        for header_name in makemake_lib.remove_duplicates(source.included_headers):
+            header_indices += headers_by_filename.get(header_name, [])
 
-                    # Otherwise, the function is called
-                    else:
+        for header_idx in header_indices:
 
-                        is_consumer = True
+            positions = declared_function_positions[header_idx]
 
-                if is_producer and not is_consumer:
+            # Look up the smaller of the two dictionaries in the other
+            if len(function_usage) < len(positions):
+                used_functions = [function for function in function_usage
+                                  if function in positions]
+            else:
+                used_functions = [function for function in positions
+                                  if function in function_usage]
 
-                    producer_consumer_dict[header][function]['producers']\
-                        .append(source)
+            for function in used_functions:
 
-                elif is_consumer and not is_producer:
+                key = (header_idx, positions[function], function)
 
-                    producer_consumer_dict[header][function]['consumers']\
-                        .append(source)
+                if function_usage[function] == 'producer':
+                    producers.setdefault(key, []).append(source)
+                else:
+                    consumed_functions[source].append(key)
 
     # Make sure that no function was implemented multiple times
-    for header in header_instances:
-
-        for function in producer_consumer_dict[header]:
-
-            n_producers = len(producer_consumer_dict[header][function]['producers'])
+    for key in sorted(producers):
 
-            if n_producers > 1:
-                abort_multiple_producers(function)
+        if len(producers[key]) > 1:
+            abort_multiple_producers(key[2])
 
-    # Convert the dictionary of producers and consumers into a dictionary
-    # of sources, where the values are the source instances of the producers
-    # for the functions that the source uses.
+    # Convert the producers and consumers into a dictionary of sources,
+    # where the values are the source instances of the producers for the
+    # functions that the source uses.
 
     object_dependencies = {}
 
     for source in source_instances:
 
-        object_dependencies[source] = []
-
-        for header in header_instances:
+        if source in reused_dependencies:
 
-            for function in producer_consumer_dict[header]:
+            object_dependencies[source], dependency_descripts = reused_dependencies[source]
+            source.dependency_descripts.update(dependency_descripts)
 
-                for consumer in producer_consumer_dict[header][function]['consumers']:
+            continue
 
-                    if source is consumer:
+        object_dependencies[source] = []
 
-                        if len(producer_consumer_dict[header][function]['producers']) > 0:
+        for key in sorted(consumed_functions[source]):
 
-                            producer_source = producer_consumer_dict[header][function]['producers'][0]
-                            object_dependencies[source].append(producer_source)
+            if key in producers:
 
-                            if producer_source.filename in source.dependency_descripts:
-                                source.dependency_descripts[producer_source.filename] \
-                                    += ', {}()'.format(function)
-                            else:
-                                source.dependency_descripts[producer_source.filename] \
-                                    = 'through {}()'.format(function)
+                function = key[2]
+                producer_source = producers[key][0]
+                object_dependencies[source].append(producer_source)
 
-                        break
+                if producer_source.filename in source.dependency_descripts:
+                    source.dependency_descripts[producer_source.filename] \
+                        += ', {}()'.format(function)
+                else:
+                    source.dependency_descripts[producer_source.filename] \
+                        = 'through {}()'.format(function)
 
         object_dependencies[source] = makemake_lib.remove_duplicates(object_dependencies[source])
 
     print('Done')
 
+    if len(reused_dependencies) > 0:
+        print('Reused the object dependencies of {} of {} sources'
+              .format(len(reused_dependencies), len(source_instances)))
+
     return object_dependencies
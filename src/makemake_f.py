@@ -8,15 +8,43 @@
 #
 import sys
 import os
+import re
 import makemake_lib
 
+# Pattern for names directly followed by a parenthesis, which may be
+# function references
+function_reference_pattern = re.compile(r'(?<![\w%])([a-z_][a-z0-9_]*)\s*\(')
+
+# Pattern for the names of called subroutines
+subroutine_call_pattern = re.compile(r'(?<![\w%])call\s+([a-z_][a-z0-9_]*)')
+
+# Pattern for character literals, in which a doubled delimiter stands for
+# the delimiter itself
+string_literal_pattern = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+
+# Flags for specifying the directory of module files, for compilers that
+# do not use the -J flag of gfortran
+module_directory_flags = {'ifort': '-module ',
+                          'ifx': '-module ',
+                          'mpiifort': '-module ',
+                          'nagfor': '-mdir ',
+                          'nvfortran': '-module ',
+                          'pgfortran': '-module '}
+
 
 class fortran_source:
 
     # This class extracts relevant information from a Fortran source
     # file and stores it in class attributes.
 
-    def __init__(self, filename_with_path, is_header=False):
+    # Must be incremented whenever the content of the parse results changes
+    parser_version = 3
+
+    # Other object files are only needed for linking, so they are
+    # order-only prerequisites of the compile rule
+    order_only_object_dependencies = True
+
+    def __init__(self, filename_with_path, is_header=False, parse_results=None):
 
         self.filename_with_path = filename_with_path
         self.is_header = is_header
@@ -25,15 +53,26 @@ class fortran_source:
         self.name = '.'.join(self.filename.split('.')[:-1])
         self.object_name = self.name + '.o'
 
-        print('Parsing... ', end='')
+        if parse_results is None:
 
-        f = open(filename_with_path, 'r')
-        self.lines = f.readlines()
-        f.close()
+            print('Parsing... ', end='')
+            parse_results = self.parse_file()
+
+        else:
+            print('Using existing parse results... ', end='')
 
-        self.programs, self.modules, self.external_functions, self.external_subroutines, \
-            self.module_dependencies, self.included_headers, self.procedure_dependencies, \
-            self.internal_libraries = self.parse_content()
+        self.parse_results = parse_results
+
+        self.programs = list(parse_results['programs'])
+        self.modules = list(parse_results['modules'])
+        self.external_functions = list(parse_results['external_functions'])
+        self.external_subroutines = list(parse_results['external_subroutines'])
+        self.module_dependencies = list(parse_results['module_dependencies'])
+        self.included_headers = list(parse_results['included_headers'])
+        self.procedure_dependencies = list(parse_results['procedure_dependencies'])
+        self.internal_libraries = dict(parse_results['internal_libraries'])
+        self.function_references = set(parse_results['function_references'])
+        self.subroutine_calls = set(parse_results['subroutine_calls'])
 
         if len(self.programs) > 1:
             self.abort_multiple_programs()
@@ -88,36 +127,105 @@ class fortran_source:
         if self.internal_libraries['openmp']:
             print('Uses OpenMP')
 
-        module_list = ' '.join(self.modules)
+        self.create_compile_rule()
+
+    def create_compile_rule(self, use_module_stamps=False, use_build_directory=False,
+                            module_directory_flag='-J'):
+
+        # This method creates the compilation rule for the makefile. If
+        # module stamps are used, sources depend on a stamp file for each
+        # used module instead of the module file itself. The stamp holds a
+        # copy of the module file, and is only updated when the content of
+        # the module file changes. If a build directory is used, the object
+        # and module files are written to the directory for the current
+        # configuration.
+
+        object_path = makemake_lib.get_object_path(self.object_name, use_build_directory)
+        module_paths = [makemake_lib.get_object_path(module_name, use_build_directory)
+                        for module_name in self.modules]
+        module_list = ' '.join(module_paths)
         module_del_list = module_list
-        module_dep_list = ' '.join(self.module_dependencies)
+        module_dep_list = ' '.join([makemake_lib.get_object_path(module_name, use_build_directory) +
+                                    ('.stamp' if use_module_stamps else '')
+                                    for module_name in self.module_dependencies])
         delete_cmd = 'del /F' if sys.platform == 'win32' else 'rm -f'
         delete_trail = ' 2>nul' if sys.platform == 'win32' else ''
         delete_text = ''
+        stamp_text = ''
 
         if len(self.modules) > 0:
 
-            module_list = ' ' + module_list
+            # The object and module files are produced by the same command,
+            # so they are declared as grouped targets
+            module_list = ' ' + module_list + ' &'
             delete_text = '\t{} {}{}\n'.format(delete_cmd, module_del_list, delete_trail)
 
         if len(self.module_dependencies) > 0:
             module_dep_list = ' ' + module_dep_list
 
+        if use_module_stamps:
+
+            for module_path in module_paths:
+
+                if sys.platform == 'win32':
+                    update_cmd = 'fc /b {0} $@ >nul 2>nul || copy /y {0} $@ >nul'.format(module_path)
+                else:
+                    update_cmd = 'cmp -s {0} $@ || cp {0} $@'.format(module_path)
+
+                stamp_text += '\n\n# Rule for updating {0}.stamp when {0} has changed' \
+                              '\n{0}.stamp: {0}\n\t@{1}'.format(module_path, update_cmd)
+
+        if use_build_directory:
+            output_text = ' {}{} -o {}'.format(module_directory_flag,
+                                               makemake_lib.object_directory,
+                                               object_path)
+        else:
+            output_text = ''
+
         # Compilation rule for the makefile
         self.compile_rule_declr = '\n\n{}\n{}{}: {}{} '\
                                   .format('# Rule for compiling ' + self.filename,
-                                          self.object_name,
+                                          object_path,
                                           module_list,
-                                          filename_with_path.replace(' ', '\ '),
+                                          self.filename_with_path.replace(' ', '\ '),
                                           module_dep_list)
 
-        self.compile_rule = '\n{}\t$(COMPILER) -c $(EXTRA_FLAGS) $(COMPILATION_FLAGS) \"{}\"' \
-                            .format(delete_text, filename_with_path)
+        self.compile_rule = '\n{}\t$(COMPILER) -c $(EXTRA_FLAGS) $(COMPILATION_FLAGS) \"{}\"{}{}' \
+                            .format(delete_text, self.filename_with_path, output_text, stamp_text)
+
+    def parse_file(self):
+
+        # This function reads the source file and returns a dictionary
+        # with the information extracted from it.
+
+        f = open(self.filename_with_path, 'r')
+        lines = f.readlines()
+        f.close()
+
+        programs, modules, external_functions, external_subroutines, \
+            module_dependencies, included_headers, procedure_dependencies, \
+            internal_libraries, function_references, \
+            subroutine_calls = self.parse_content(lines)
 
-    def parse_content(self):
+        return {'programs': programs,
+                'modules': modules,
+                'external_functions': external_functions,
+                'external_subroutines': external_subroutines,
+                'module_dependencies': module_dependencies,
+                'included_headers': included_headers,
+                'procedure_dependencies': procedure_dependencies,
+                'internal_libraries': internal_libraries,
+                'function_references': function_references,
+                'subroutine_calls': subroutine_calls}
+
+    def parse_content(self, lines):
 
         # This function parses the source code lines and extracts
-        # information about the content of the source files.
+        # information about the content of the source files. In addition
+        # to the declarations, it collects the names of all functions
+        # that may be referenced and all subroutines that are called, so
+        # that procedure calls can be detected without scanning the lines
+        # again.
 
         programs = []
         modules = []
@@ -126,6 +234,8 @@ class fortran_source:
         module_dependencies = []
         included_headers = []
         procedure_dependencies = []
+        function_references = set()
+        subroutine_calls = set()
 
         internal_libraries = {'mpi': False, 'openmp': False}
 
@@ -134,7 +244,7 @@ class fortran_source:
         unknown_in_or_out = self.is_header
 
         # Parse source file
-        for line in self.lines:
+        for line in lines:
 
             # Ignore everything after "!"
             words = (prev_line + line).split('!')[0]
@@ -274,6 +384,15 @@ class fortran_source:
 
                     unknown_in_or_out = False
 
+                # Collect names that may refer to procedure calls
+                else:
+
+                    # Remove character literals
+                    joined_words = string_literal_pattern.sub(' ', ' '.join(words))
+
+                    function_references.update(function_reference_pattern.findall(joined_words))
+                    subroutine_calls.update(subroutine_call_pattern.findall(joined_words))
+
         # Ignore dependencies on modules and procedures in the same file
 
         for dep in list(module_dependencies):
@@ -289,154 +408,46 @@ class fortran_source:
         included_headers = makemake_lib.remove_duplicates(included_headers)
 
         return programs, modules, external_functions, external_subroutines, \
-            module_dependencies, included_headers, procedure_dependencies, internal_libraries
-
-    def detect_procedure_calls(self, functions_to_detect, subroutines_to_detect):
-
-        # This function parses the source code lines and returns which of
-        # the given procedures are called.
-
-        detected_procedure_calls = []
-
-        prev_line = ''
-        inside = False
-        unknown_in_or_out = self.is_header
-
-        # Parse source file
-        for line in self.lines:
-
-            # Ignore everything after "!"
-            words = (prev_line + line).split('!')[0]
-
-            # Skip blank lines
-            if len(words.split()) == 0:
-                continue
-
-            # Skip commented lines
-            if words[0][0] in ['c', 'C', '*']:
-                continue
-
-            # If line is continued
-            if words.strip()[-1] == '&':
-
-                # Save this line and continue to next one
-                prev_line = words.split('&')[0] + ' '
-                continue
-
-            else:
-                prev_line = ''
-
-            words = words.replace(',', ' ')      # Treat "," as word separator
-            words = words.replace('::', ' :: ')  # Ensure separation at "::"
-
-            words = [word.lower() for word in words.split()]
-
-            n_words = len(words)
-
-            first_word = words[0]
-            second_word = '' if n_words < 2 else words[1]
-
-            # External scope declarations
-            if not inside or unknown_in_or_out:
-
-                # Check for program declaration
-                if first_word == 'program':
-
-                    inside = 'program'
-                    unknown_in_or_out = False
-
-                # Check for module declaration
-                elif first_word == 'module':
-
-                    inside = 'module'
-                    unknown_in_or_out = False
-
-                # Check for external function declaration
-                elif 'function' in words:
-
-                    idx = words.index('function')
-
-                    if n_words > idx + 1:
-
-                        inside = 'function'
-                        unknown_in_or_out = False
-
-                # Check for external subroutine declaration
-                elif 'subroutine' in words:
-
-                    idx = words.index('subroutine')
-
-                    if n_words > idx + 1:
-
-                        inside = 'subroutine'
-                        unknown_in_or_out = False
-
-            # Internal scope declarations
-            if inside or unknown_in_or_out:
+            module_dependencies, included_headers, procedure_dependencies, internal_libraries, \
+            sorted(function_references), sorted(subroutine_calls)
 
-                # Check for module import statement
-                if first_word == 'use':
-
-                    unknown_in_or_out = False
-
-                # Check for end of external scope
-                elif first_word == 'end' and \
-                     (second_word == inside or second_word == ''):
+    def detect_procedure_calls(self, function_index, subroutine_index):
 
-                    inside = False
-                    unknown_in_or_out = False
-
-                else:
-
-                    # Check for declaration of external procedure
-                    if 'external' in words:
-
-                        unknown_in_or_out = False
+        # This function returns the calls the source makes to procedures in
+        # the given indices, which map procedure names to lists of
+        # (defining source position, procedure position) tuples. Each call is
+        # returned as a (defining source position, is subroutine, procedure
+        # position, name) tuple. Only procedures in the referenced names
+        # collected when the file was parsed are looked up.
 
-                    elif len(functions_to_detect) > 0 or \
-                         len(subroutines_to_detect) > 0:
+        detected_calls = []
 
-                        joined_words = ' '.join(words).replace('\'', '\"')
-                        joined_words = ''.join(joined_words.split('\"')[::2])
+        for function in self.function_references:
+            for source_idx, function_idx in function_index.get(function, []):
+                detected_calls.append((source_idx, False, function_idx, function))
 
-                        found_procedure_call = False
+        for subroutine in self.subroutine_calls:
+            for source_idx, subroutine_idx in subroutine_index.get(subroutine, []):
+                detected_calls.append((source_idx, True, subroutine_idx, subroutine))
 
-                        for function in list(functions_to_detect):
+        return detected_calls
 
-                            function_splitted = joined_words.split(function)
+    def get_provided_names(self):
 
-                            if len(function_splitted) > 1:
+        # This function returns the names of the modules and external
+        # procedures that the source implements, which other sources can
+        # depend on it for.
 
-                                before = function_splitted[0]
-                                stripped = function_splitted[1].strip()
+        return self.modules + self.external_functions + self.external_subroutines
 
-                                if len(stripped) > 0 and \
-                                   stripped[0] == '(' and \
-                                   (len(before) == 0 or not (before[-1] in
-                                                             ['abcdefghijklmnopqrstuvwxyz_'])):
+    def get_used_names(self):
 
-                                    detected_procedure_calls.append(function)
-                                    functions_to_detect.remove(function)
-                                    found_procedure_call = True
+        # This function returns the names of the modules and procedures
+        # that the source uses, together with all the names that may refer
+        # to procedure calls.
 
-                        if not found_procedure_call:
-
-                            for subroutine in list(subroutines_to_detect):
-
-                                subroutine_splitted = joined_words.split(subroutine)
-
-                                if len(subroutine_splitted) > 1:
-
-                                    splitted = subroutine_splitted[0].split()
-                                    stripped = subroutine_splitted[1].strip()
-
-                                    if len(stripped) > 0 and stripped[0] == '(' and \
-                                       len(splitted) > 0 and splitted[-1] == 'call':
-
-                                        detected_procedure_calls.append(subroutine)
-                                        subroutines_to_detect.remove(subroutine)
-
-        return detected_procedure_calls
+        return self.module_dependencies + self.procedure_dependencies + \
+            list(self.function_references) + list(self.subroutine_calls)
 
     def abort_multiple_programs(self):
 
@@ -503,9 +514,10 @@ class fortran_source:
 
 class fortran_header(fortran_source):
 
-    def __init__(self, filename_with_path):
+    def __init__(self, filename_with_path, parse_results=None):
 
-        super().__init__(filename_with_path, is_header=True)
+        super().__init__(filename_with_path, is_header=True,
+                         parse_results=parse_results)
 
 
 def generate_makefile(manager, sources):
@@ -519,18 +531,37 @@ def generate_makefile(manager, sources):
     elif manager.library:
         print('\nGenerating makefile for library \"{}\"...\n'
               .format(manager.library))
+    elif sources.program_sources is not None:
+        print('\nGenerating combined makefile for executables {}...\n'
+              .format(', '.join(['\"{}\"'.format(program_source.executable_name)
+                                 for program_source in sources.program_sources])))
     else:
         print('\nGenerating makefile for executable \"{}\"...\n'
               .format(sources.program_source.executable_name))
 
     # Get information from files
 
+    if manager.state is not None:
+        sources.use_previous_edges(manager.state,
+                                   makemake_lib.get_pure_output_name(manager, sources))
+
     sources.determine_header_dependencies()
 
+    if manager.module_firewall or manager.build_directory:
+
+        module_directory_flag = module_directory_flags.get(manager.compiler, '-J')
+
+        for source in sources.source_instances:
+            source.create_compile_rule(use_module_stamps=manager.module_firewall,
+                                       use_build_directory=manager.build_directory,
+                                       module_directory_flag=module_directory_flag)
+
     all_modules = check_dependency_presence(sources.source_instances)
-    object_dependencies = determine_object_dependencies(sources.source_instances)
+    object_dependencies = determine_object_dependencies(sources.source_instances,
+                                                        sources.find_reusable_object_dependencies())
 
-    dependency_text = sources.process_dependencies(object_dependencies)
+    dependency_text = sources.process_dependencies(object_dependencies,
+                                                   cycle_policy=manager.cycle_policy)
 
     print('\nGenerating makefile text... ', end='')
 
@@ -538,13 +569,24 @@ def generate_makefile(manager, sources):
         output_name, object_files, compilation_flags, \
         linking_flags, header_path_flags, library_link_flags, \
         library_path_flags, debug_flags, fast_flags, \
+        pgo_instrument_flags, pgo_use_flags, lto_flags, lto_archiver, \
         compile_rule_string, delete_cmd, delete_trail, \
         help_text = makemake_lib.get_common_makefile_parameters(manager,
                                                                 sources,
                                                                 'gfortran',
                                                                 'mpifort')
 
-    module_files = ' '.join(all_modules)
+    optional_variables = makemake_lib.get_optional_variables(manager)
+    pgo_rules = makemake_lib.get_pgo_rules()
+
+    module_paths = [makemake_lib.get_object_path(module_name, manager.build_directory)
+                    for module_name in all_modules]
+
+    if manager.module_firewall:
+        module_files = ' '.join([module_path + ' ' + module_path + '.stamp'
+                                 for module_path in module_paths])
+    else:
+        module_files = ' '.join(module_paths)
 
     # Create makefile
     if manager.library and not manager.library_is_shared:
@@ -562,6 +604,7 @@ def generate_makefile(manager, sources):
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -576,10 +619,14 @@ MODULE_FILES = {}
 COMPILATION_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
-HEADER_PATH_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
+ARCHIVER = ar
+LTO_ARCHIVER = {}
+HEADER_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags clean help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags clean help
 
 # Define default target group
 all: $(LIBRARY)
@@ -587,6 +634,7 @@ all: $(LIBRARY)
 # Define optional target groups
 debug: set_debug_flags $(LIBRARY)
 fast: set_fast_flags $(LIBRARY)
+lto: set_lto_flags $(LIBRARY)
 
 # Defines appropriate compiler flags for debugging
 set_debug_flags:
@@ -596,9 +644,14 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval ARCHIVER = $(LTO_ARCHIVER))
+
 # Rule for linking object files
 $(LIBRARY): $(OBJECT_FILES)
-\tar rcs $(LIBRARY) $(OBJECT_FILES){}
+\t$(ARCHIVER) rcs $(LIBRARY) $(OBJECT_FILES){}
 
 # Action for removing all auxiliary files
 clean:
@@ -616,7 +669,10 @@ help:
             compilation_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
+            lto_archiver,
             header_path_flags,
+            optional_variables,
             compile_rule_string,
             delete_cmd,
             delete_trail,
@@ -637,6 +693,7 @@ help:
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -652,12 +709,14 @@ COMPILATION_FLAGS = {}
 LINKING_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
 HEADER_PATH_FLAGS = {}
 LIBRARY_LINKING_FLAGS = {}
-LIBRARY_PATH_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags clean help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags clean help
 
 # Define default target group
 all: $(LIBRARY)
@@ -665,6 +724,7 @@ all: $(LIBRARY)
 # Define optional target groups
 debug: set_debug_flags $(LIBRARY)
 fast: set_fast_flags $(LIBRARY)
+lto: set_lto_flags $(LIBRARY)
 
 # Defines appropriate compiler flags for debugging
 set_debug_flags:
@@ -674,6 +734,11 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
 # Rule for linking object files
 $(LIBRARY): $(OBJECT_FILES)
 \t$(COMPILER) $(EXTRA_FLAGS) $(LINKING_FLAGS) $(OBJECT_FILES) $(LIBRARY_PATH_FLAGS) $(LIBRARY_LINKING_FLAGS) -o $(LIBRARY){}
@@ -695,14 +760,136 @@ help:
             linking_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
             header_path_flags,
             library_link_flags,
             library_path_flags,
+            optional_variables,
             compile_rule_string,
             delete_cmd,
             delete_trail,
             help_text)
 
+    elif sources.program_sources is not None:
+
+        # Multiple executables
+
+        program_variables, link_rules = \
+            makemake_lib.get_program_link_rules(sources, use_build_directory=manager.build_directory)
+
+        makefile = '''#@{}
+# This makefile was generated by makemake.py ({}).
+# GitHub repository: https://github.com/lars-frogner/makemake.py
+#
+# Usage:
+# make <argument 1> <argument 2> ...
+#
+# Arguments:
+# <none>:  Compiles with no compiler flags.
+# debug:   Compiles with flags useful for debugging.
+# fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
+# profile: Compiles with flags for profiling.
+# gprof:   Displays the profiling results with gprof.
+# pgo-instrument: Compiles with instrumentation for profile-guided optimization.
+# pgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.
+# pgo:     Compiles with optimizations guided by the training runs.
+# clean:   Deletes auxiliary files.
+# help:    Displays this help text.
+#
+# To compile with additional flags, add the argument
+# EXTRA_FLAGS="<flags>"
+#
+# To build a single executable, give its name as an argument. gprof
+# uses the first executable unless EXECUTABLE=<name> is added.
+
+# Define variables
+COMPILER = {}
+EXECUTABLES = {}
+EXECUTABLE = $(firstword $(EXECUTABLES))
+OBJECT_FILES = {}{}
+MODULE_FILES = {}
+COMPILATION_FLAGS = {}
+LINKING_FLAGS = {}
+DEBUGGING_FLAGS = {}
+PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
+PROFILING_FLAGS = -pg
+PGO_INSTRUMENT_FLAGS = {}
+PGO_USE_FLAGS = {}
+PGO_DIR = pgo
+MAKEFILE_PATH := $(abspath $(firstword $(MAKEFILE_LIST)))
+HEADER_PATH_FLAGS = {}
+LIBRARY_LINKING_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
+
+# Make sure certain rules are not activated by the presence of files
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags set_profile_flags clean gprof pgo-instrument pgo-train pgo help
+
+# Define default target group
+all: $(EXECUTABLES)
+
+# Define optional target groups
+debug: set_debug_flags $(EXECUTABLES)
+fast: set_fast_flags $(EXECUTABLES)
+lto: set_lto_flags $(EXECUTABLES)
+profile: set_profile_flags $(EXECUTABLES)
+
+# Defines appropriate compiler flags for debugging
+set_debug_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(DEBUGGING_FLAGS))
+
+# Defines appropriate compiler flags for high performance
+set_fast_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
+
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
+# Defines appropriate compiler flags for profiling
+set_profile_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PROFILING_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PROFILING_FLAGS)){}{}
+
+# Action for removing all auxiliary files
+clean:
+\t{} $(OBJECT_FILES) $(MODULE_FILES){}
+
+# Action for reading profiling results
+gprof:
+\tgprof $(EXECUTABLE){}
+
+# Action for printing help text
+help:
+\t@echo {}''' \
+    .format(pure_output_name,
+            current_time,
+            compiler,
+            output_name,
+            object_files,
+            program_variables,
+            module_files,
+            compilation_flags,
+            linking_flags,
+            debug_flags,
+            fast_flags,
+            lto_flags,
+            pgo_instrument_flags,
+            pgo_use_flags,
+            header_path_flags,
+            library_link_flags,
+            library_path_flags,
+            optional_variables,
+            link_rules,
+            compile_rule_string,
+            delete_cmd,
+            delete_trail,
+            pgo_rules,
+            help_text)
+
     else:
 
         # Executable
@@ -718,8 +905,12 @@ help:
 # <none>:  Compiles with no compiler flags.
 # debug:   Compiles with flags useful for debugging.
 # fast:    Compiles with flags for high performance.
+# lto:     Compiles with flags for high performance and link-time optimization.
 # profile: Compiles with flags for profiling.
 # gprof:   Displays the profiling results with gprof.
+# pgo-instrument: Compiles with instrumentation for profile-guided optimization.
+# pgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.
+# pgo:     Compiles with optimizations guided by the training runs.
 # clean:   Deletes auxiliary files.
 # help:    Displays this help text.
 #
@@ -735,13 +926,19 @@ COMPILATION_FLAGS = {}
 LINKING_FLAGS = {}
 DEBUGGING_FLAGS = {}
 PERFORMANCE_FLAGS = {}
+LTO_JOBS = auto
+LTO_FLAGS = {}
 PROFILING_FLAGS = -pg
+PGO_INSTRUMENT_FLAGS = {}
+PGO_USE_FLAGS = {}
+PGO_DIR = pgo
+MAKEFILE_PATH := $(abspath $(firstword $(MAKEFILE_LIST)))
 HEADER_PATH_FLAGS = {}
 LIBRARY_LINKING_FLAGS = {}
-LIBRARY_PATH_FLAGS = {}
+LIBRARY_PATH_FLAGS = {}{}
 
 # Make sure certain rules are not activated by the presence of files
-.PHONY: all debug fast profile set_debug_flags set_fast_flags set_profile_flags clean gprof help
+.PHONY: all debug fast lto profile set_debug_flags set_fast_flags set_lto_flags set_profile_flags clean gprof pgo-instrument pgo-train pgo help
 
 # Define default target group
 all: $(EXECUTABLE)
@@ -749,6 +946,7 @@ all: $(EXECUTABLE)
 # Define optional target groups
 debug: set_debug_flags $(EXECUTABLE)
 fast: set_fast_flags $(EXECUTABLE)
+lto: set_lto_flags $(EXECUTABLE)
 profile: set_profile_flags $(EXECUTABLE)
 
 # Defines appropriate compiler flags for debugging
@@ -759,6 +957,11 @@ set_debug_flags:
 set_fast_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS))
 
+# Defines appropriate compiler flags for link-time optimization
+set_lto_flags:
+\t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+\t$(eval LINKING_FLAGS = $(LINKING_FLAGS) $(PERFORMANCE_FLAGS) $(LTO_FLAGS))
+
 # Defines appropriate compiler flags for profiling
 set_profile_flags:
 \t$(eval COMPILATION_FLAGS = $(COMPILATION_FLAGS) $(PROFILING_FLAGS))
@@ -774,7 +977,7 @@ clean:
 
 # Action for reading profiling results
 gprof:
-\tgprof $(EXECUTABLE)
+\tgprof $(EXECUTABLE){}
 
 # Action for printing help text
 help:
@@ -789,20 +992,31 @@ help:
             linking_flags,
             debug_flags,
             fast_flags,
+            lto_flags,
+            pgo_instrument_flags,
+            pgo_use_flags,
             header_path_flags,
             library_link_flags,
             library_path_flags,
+            optional_variables,
             compile_rule_string,
             delete_cmd,
             delete_trail,
+            pgo_rules,
             help_text)
 
     print('Done')
 
     print(dependency_text)
 
-    writer = makemake_lib.file_writer(manager.working_dir_path)
-    writer.save_makefile(makefile, pure_output_name)
+    if manager.state is not None:
+        manager.state.update_output(pure_output_name, sources)
+
+    writer = makemake_lib.file_writer(manager.working_dir_path,
+                                      policy=manager.existing_makefile_policy,
+                                      non_recursive_wrapper=manager.non_recursive_wrapper)
+    writer.save_makefile(makefile, pure_output_name,
+                         incremental=manager.state is not None)
 
 
 def check_dependency_presence(source_instances):
@@ -914,44 +1128,50 @@ def check_dependency_presence(source_instances):
     return all_modules
 
 
-def determine_object_dependencies(source_instances):
+def determine_object_dependencies(source_instances, reused_dependencies=None):
 
     # This function creates a dictionary with the fortran_source instances
     # as keys. The values are lists of fortran_source instances for the other
     # sources that implement modules and procedures that the source uses.
+    # The dependencies of the sources in the given dictionary of reused
+    # dependencies are taken from it, together with their descriptions.
 
-    print('Finding external procedure dependencies... ', end='')
+    if reused_dependencies is None:
+        reused_dependencies = {}
 
-    for source in source_instances:
-
-        functions_to_detect = source.external_functions
-        subroutines_to_detect = source.external_subroutines
+    print('Finding external procedure dependencies... ', end='')
 
-        for other_source in source_instances:
+    # Index the external procedures by name once, so that each source only
+    # has to look up the names it references
+    function_index = {}
+    subroutine_index = {}
 
-            if other_source is not source:
+    for source_idx, source in enumerate(source_instances):
 
-                functions_to_detect_filtered = []
-                subroutines_to_detect_filtered = []
+        for function_idx, func in enumerate(source.external_functions):
+            function_index.setdefault(func, []).append((source_idx, function_idx))
 
-                for func in functions_to_detect:
+        for subroutine_idx, sub in enumerate(source.external_subroutines):
+            subroutine_index.setdefault(sub, []).append((source_idx, subroutine_idx))
 
-                    if func not in other_source.procedure_dependencies:
+    for other_source_idx, other_source in enumerate(source_instances):
 
-                        functions_to_detect_filtered.append(func)
+        if other_source in reused_dependencies:
+            continue
 
-                for sub in subroutines_to_detect:
+        # Add the calls ordered by the defining source, with functions
+        # before subroutines
+        detected_procedure_calls = sorted(other_source.detect_procedure_calls(function_index,
+                                                                              subroutine_index))
 
-                    if sub not in other_source.procedure_dependencies:
+        known_procedures = set(other_source.procedure_dependencies)
 
-                        subroutines_to_detect_filtered.append(sub)
+        for source_idx, _, _, procedure in detected_procedure_calls:
 
-                detected_procedure_calls = other_source.detect_procedure_calls(
-                                                            functions_to_detect_filtered,
-                                                            subroutines_to_detect_filtered
-                                                                              )
+            if source_idx != other_source_idx and procedure not in known_procedures:
 
-                other_source.procedure_dependencies += detected_procedure_calls
+                other_source.procedure_dependencies.append(procedure)
+                known_procedures.add(procedure)
 
     print('Done')
 
@@ -959,53 +1179,71 @@ def determine_object_dependencies(source_instances):
 
     object_dependencies = {}
 
+    # Map module and procedure names to the sources implementing them
+    module_sources = {}
+    procedure_sources = {}
+
+    for source in source_instances:
+
+        for module in source.modules:
+            module_sources.setdefault(module, []).append(source)
+
+        for procedure in makemake_lib.remove_duplicates(source.external_functions +
+                                                        source.external_subroutines):
+            procedure_sources.setdefault(procedure, []).append(source)
+
     # For each source
     for source in source_instances:
 
+        if source in reused_dependencies:
+
+            object_dependencies[source], dependency_descripts = reused_dependencies[source]
+            source.dependency_descripts.update(dependency_descripts)
+
+            continue
+
         object_dependencies[source] = []
 
         # For each module dependency the source has
         for module in source.module_dependencies:
 
-            # Loop through all the other sources
-            for other_source in source_instances:
+            # Loop through the sources that have the module
+            for other_source in module_sources.get(module, []):
 
                 if other_source is not source:
 
-                    # Add source instance if it has the correct module
-                    if module in other_source.modules:
+                    object_dependencies[source].append(other_source)
 
-                        object_dependencies[source].append(other_source)
-
-                        if other_source.filename in source.dependency_descripts:
-                            source.dependency_descripts[other_source.filename] \
-                                += ', ' + module
-                        else:
-                            source.dependency_descripts[other_source.filename] \
-                                = 'through ' + module
+                    if other_source.filename in source.dependency_descripts:
+                        source.dependency_descripts[other_source.filename] \
+                            += ', ' + module
+                    else:
+                        source.dependency_descripts[other_source.filename] \
+                            = 'through ' + module
 
         # Repeat for procedure dependencies
         for procedure in source.procedure_dependencies:
 
-            for other_source in source_instances:
+            for other_source in procedure_sources.get(procedure, []):
 
                 if other_source is not source:
 
-                    if procedure in (other_source.external_functions +
-                                     other_source.external_subroutines):
-
-                        object_dependencies[source].append(other_source)
+                    object_dependencies[source].append(other_source)
 
-                        if other_source.filename in source.dependency_descripts:
-                            source.dependency_descripts[other_source.filename] \
-                                += ', {}()'.format(procedure)
-                        else:
-                            source.dependency_descripts[other_source.filename] \
-                                = 'through {}()'.format(procedure)
+                    if other_source.filename in source.dependency_descripts:
+                        source.dependency_descripts[other_source.filename] \
+                            += ', {}()'.format(procedure)
+                    else:
+                        source.dependency_descripts[other_source.filename] \
+                            = 'through {}()'.format(procedure)
 
         # Get rid of duplicate instances
         object_dependencies[source] = makemake_lib.remove_duplicates(object_dependencies[source])
 
     print('Done')
 
+    if len(reused_dependencies) > 0:
+        print('Reused the object dependencies of {} of {} sources'
+              .format(len(reused_dependencies), len(source_instances)))
+
     return object_dependencies
@@ -8,7 +8,45 @@
 #
 import sys
 import os
+import re
 import datetime
+import copy
+import hashlib
+import pickle
+import io
+import contextlib
+import collections
+import concurrent.futures
+
+# Name identifying combined makefiles for several programs
+combined_output_name = 'programs'
+
+# Makefile variable holding the directory for object files when a build
+# directory is used, and the separator used in paths within it
+object_directory = '$(OBJECT_DIR)'
+object_path_separator = '\\' if sys.platform == 'win32' else '/'
+
+# Name of the file holding the compilation command that the objects were
+# last compiled with
+flag_signature_name = '.makemake_flags'
+
+# Compiler caches that can be used as launchers, with the environment
+# variable selecting their cache directory and the arguments making them
+# display their statistics
+compiler_caches = {'ccache': ('CCACHE_DIR', '-s'),
+                   'sccache': ('SCCACHE_DIR', '--show-stats')}
+
+# Archivers that can handle the intermediate code in object files compiled
+# for link-time optimization
+lto_archivers = {'gcc': 'gcc-ar',
+                 'g++': 'gcc-ar',
+                 'gfortran': 'gcc-ar',
+                 'icc': 'xiar',
+                 'ifort': 'xiar',
+                 'clang': 'llvm-ar',
+                 'clang++': 'llvm-ar',
+                 'flang': 'llvm-ar',
+                 'flang-new': 'llvm-ar'}
 
 
 class file_manager:
@@ -28,7 +66,23 @@ class file_manager:
                  header_class,
                  compiler,
                  executable,
-                 library):
+                 library,
+                 use_cache=False,
+                 n_jobs=1,
+                 incremental=False,
+                 combined=False,
+                 missing_header_policy=None,
+                 cycle_policy=None,
+                 existing_makefile_policy=None,
+                 module_firewall=False,
+                 use_depfiles=False,
+                 build_directory=False,
+                 flag_signatures=False,
+                 launcher=False,
+                 launcher_cache=None,
+                 precompiled_headers=0,
+                 unity_budget=None,
+                 non_recursive_wrapper=False):
 
         self.working_dir_path = working_dir_path
         self.source_paths = source_paths
@@ -43,6 +97,24 @@ class file_manager:
         self.executable = executable
         self.library = library
         self.library_is_shared = library and library.split('.')[-1] == 'so'
+        self.cache = parse_cache(working_dir_path) if use_cache or incremental else None
+        self.state = dependency_state(self.cache) if incremental else None
+        self.n_jobs = n_jobs
+        self.combined = combined
+        self.missing_header_policy = missing_header_policy
+        self.cycle_policy = cycle_policy
+        self.existing_makefile_policy = existing_makefile_policy
+        self.module_firewall = module_firewall
+        self.use_depfiles = use_depfiles
+        self.build_directory = build_directory
+        self.flag_signatures = flag_signatures
+        self.launcher = launcher
+        self.launcher_cache = launcher_cache
+        self.precompiled_headers = precompiled_headers
+        self.unity_budget = unity_budget
+        self.non_recursive_wrapper = non_recursive_wrapper
+        self.directory_listings = {}
+        self.file_indices = {}
 
         self.source_instances, self.header_instances, self.library_link_names, \
             self.all_header_paths, self.all_library_paths, \
@@ -58,7 +130,7 @@ class file_manager:
 
         # Process source files
 
-        source_instances = []
+        filenames_with_path = []
 
         for file_string in self.source_files:
 
@@ -66,7 +138,10 @@ class file_manager:
                                                       self.source_paths
                                                       )[1]
 
-            source_instances.append(self.source_class(filename_with_path))
+            filenames_with_path.append(filename_with_path)
+
+        source_instances = self.create_instances(self.source_class,
+                                                 filenames_with_path)
 
         # Process header files
 
@@ -116,10 +191,127 @@ class file_manager:
 
         all_library_paths = self.library_paths + extra_library_paths
 
+        if self.cache is not None:
+            self.cache.save()
+
         return source_instances, header_instances, library_link_names, \
             all_header_paths, all_library_paths, shared_library_paths, \
             library_dependencies
 
+    def create_instances(self, instance_class, filenames_with_path):
+
+        # This method creates source or header instances for the given
+        # files. Cached parse results are reused for unchanged files, and
+        # the remaining files are parsed in parallel if multiple jobs are
+        # requested. The instances are returned in the order of the input.
+
+        all_parse_results = [None]*len(filenames_with_path)
+
+        if self.cache is not None:
+
+            for i in range(len(filenames_with_path)):
+
+                all_parse_results[i] = self.cache.lookup(instance_class,
+                                                         filenames_with_path[i])
+
+        is_cached = [parse_results is not None for parse_results in all_parse_results]
+
+        unparsed_indices = [i for i in range(len(filenames_with_path))
+                            if all_parse_results[i] is None]
+
+        if self.n_jobs > 1 and len(unparsed_indices) > 1:
+
+            n_workers = min(self.n_jobs, len(unparsed_indices))
+
+            print('\nParsing {} files using {} processes... '
+                  .format(len(unparsed_indices), n_workers), end='')
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+
+                worker_results = executor.map(parse_file,
+                                              [instance_class]*len(unparsed_indices),
+                                              [filenames_with_path[i]
+                                               for i in unparsed_indices],
+                                              chunksize=max(1, len(unparsed_indices)//(4*n_workers)))
+
+                for i, parse_results in zip(unparsed_indices, worker_results):
+                    all_parse_results[i] = parse_results
+
+            print('Done')
+
+        instances = []
+
+        for i in range(len(filenames_with_path)):
+
+            filename_with_path = filenames_with_path[i]
+
+            print('\n{}:'.format(filename_with_path.split(os.sep)[-1]))
+
+            instance = instance_class(filename_with_path,
+                                      parse_results=all_parse_results[i])
+
+            if self.cache is not None and not is_cached[i]:
+                self.cache.store(instance_class, filename_with_path, instance.parse_results)
+
+            instances.append(instance)
+
+        return instances
+
+    def list_directory(self, path):
+
+        # This method returns the set of names of the files in the given
+        # directory. Each directory is only listed once.
+
+        if path not in self.directory_listings:
+
+            filenames = set()
+
+            try:
+                for entry in os.scandir(path):
+                    if entry.is_file():
+                        filenames.add(entry.name)
+
+            except OSError:
+                pass
+
+            self.directory_listings[path] = filenames
+
+        return self.directory_listings[path]
+
+    def is_in_directory(self, filename, path):
+
+        # This method checks whether the given directory contains a file
+        # with the given name. The directory listing is checked first, and
+        # the file itself only if the name is not listed, since file systems
+        # that ignore case also find names that differ in case.
+
+        return filename in self.list_directory(path) or \
+            os.path.isfile(os.path.join(path, filename))
+
+    def get_file_index(self, search_paths):
+
+        # This method returns a dictionary with the names of the files in
+        # the given search paths as keys. The values are lists of the paths
+        # that contain each file, in the same order as the search paths.
+
+        key = tuple(search_paths)
+
+        if key not in self.file_indices:
+
+            file_index = {}
+
+            for path in remove_duplicates(search_paths):
+                for filename in self.list_directory(path):
+
+                    if filename in file_index:
+                        file_index[filename].append(path)
+                    else:
+                        file_index[filename] = [path]
+
+            self.file_indices[key] = file_index
+
+        return self.file_indices[key]
+
     def search_for_file(self, file_string, search_paths, abort_on_fail=True):
 
         # This method searches for the given file and returns the full
@@ -177,24 +369,31 @@ class file_manager:
 
             # If not present in the working directory, search the given list of paths
 
-            if not os.path.isfile(filename_with_path):
+            if not self.is_in_directory(filename, self.working_dir_path):
 
                 print('Not found')
                 found = False
 
-                for possible_path in search_paths:
+                if len(search_paths) > 0:
 
-                    print('Searching in \"{}\"... '.format(possible_path), end='')
+                    print('Searching in search paths... ', end='')
 
-                    filename_with_path = os.path.join(possible_path, filename)
+                    # The directories containing the file, in the order of the search paths
+                    possible_paths = self.get_file_index(search_paths).get(filename, [])
 
-                    if os.path.isfile(filename_with_path):
+                    # The listings only contain the exact names, so check the
+                    # paths directly in case the file system ignores case
+                    if len(possible_paths) == 0:
+                        possible_paths = [path for path in remove_duplicates(search_paths)
+                                          if self.is_in_directory(filename, path)]
 
-                        print('Found')
+                    if len(possible_paths) > 0:
 
                         found = True
-                        path = possible_path
-                        break
+                        path = possible_paths[0]
+                        filename_with_path = os.path.join(path, filename)
+
+                        print('Found in \"{}\"'.format(path))
 
                     else:
                         print('Not found')
@@ -212,10 +411,12 @@ class file_manager:
 
         if not found and not abort_on_fail:
 
-            ans = ''
-            while ans not in ['y', 'n']:
-                ans = input('Could not find \"{}\". Still continue? [y/n]\n'
-                            .format(filename)).lower()
+            policy_answers = {'skip': 'y', 'fail': 'n'}
+
+            ans = get_answer('Could not find \"{}\". Still continue? [y/n]\n'
+                             .format(filename),
+                             ['y', 'n'],
+                             policy_answers.get(self.missing_header_policy))
 
             if ans == 'n':
                 abort()
@@ -228,7 +429,7 @@ class file_manager:
         # This method creates a list of fortran_source header instances
         # from the given lists of filenames and paths.
 
-        header_instances = []
+        filenames_with_path = []
         extra_header_paths = []
 
         for file_string in header_files:
@@ -240,20 +441,35 @@ class file_manager:
                                             )[:4]
             if found:
 
-                header_instances.append(self.header_class(filename_with_path))
+                filenames_with_path.append(filename_with_path)
 
                 if has_unlisted_path and path not in extra_header_paths:
                     extra_header_paths.append(path)
 
+        header_instances = self.create_instances(self.header_class,
+                                                 filenames_with_path)
+
         return header_instances, extra_header_paths
 
     def find_missing_headers(self, source_instances, header_instances):
 
-        # Find all headers included by any source or header file
+        # Find all headers included by any source or header file. Found
+        # headers are indexed by filename, and the names that have been
+        # searched for are kept in a set, so each include is resolved with
+        # dictionary lookups. Only newly found headers are examined in the
+        # next round, so every file is visited exactly once.
 
         missing_header_instances = []
         missing_header_paths = []
 
+        header_index = {}
+
+        for header in header_instances:
+            if header.filename not in header_index:
+                header_index[header.filename] = header
+
+        searched_header_names = set()
+
         iter_list = source_instances + header_instances
 
         while len(iter_list) > 0:
@@ -264,21 +480,12 @@ class file_manager:
 
                 for header_name in source.included_headers:
 
-                    found = False
-
-                    for header in header_instances + missing_header_instances:
-
-                        if header_name == header.filename:
-
-                            found = True
-                            break
-
-                    if not found:
+                    if header_name not in header_index and \
+                       header_name not in searched_header_names:
 
+                        searched_header_names.add(header_name)
                         missing_headers.append(header_name)
 
-            missing_headers = remove_duplicates(missing_headers)
-
             if len(missing_headers) > 0:
                 print('\nFound unspecified header dependencies' +
                       '\nStarting search for missing headers...')
@@ -287,8 +494,11 @@ class file_manager:
                 extra_header_paths = self.process_headers(missing_headers,
                                                           abort_on_fail=False)
 
-            missing_header_instances = remove_duplicates(missing_header_instances +
-                                                         extra_header_instances)
+            for header in extra_header_instances:
+                if header.filename not in header_index:
+                    header_index[header.filename] = header
+
+            missing_header_instances += extra_header_instances
             missing_header_paths = remove_duplicates(missing_header_paths +
                                                      extra_header_paths)
 
@@ -299,7 +509,8 @@ class file_manager:
     def collect_programs(self):
 
         # This method finds all program sources and creates a source
-        # container for each of them.
+        # container for each of them, or a single container for all of
+        # them if a combined makefile is to be generated.
 
         program_sources = []
 
@@ -342,6 +553,20 @@ class file_manager:
                                                       self.header_instances,
                                                       self.library_dependencies))
 
+        elif self.combined:
+
+            print('\nPrograms to generate a combined makefile for:\n{}'
+                  .format('\n'.join(['-{} ({})'
+                                     .format(src.executable_name,
+                                             src.filename)
+                                     for src in program_sources])))
+
+            source_containers.append(source_container(None,
+                                                      self.source_instances,
+                                                      self.header_instances,
+                                                      self.library_dependencies,
+                                                      program_sources=program_sources))
+
         else:
 
             if len(program_sources) > 1:
@@ -352,10 +577,14 @@ class file_manager:
                                                  src.filename)
                                          for src in program_sources])))
 
+            # Each container gets its own copies of the sources, since the
+            # dependency analysis updates the sources with information from
+            # the headers and sources they depend on
             for program_source in program_sources:
 
-                new_source_instances = [program_source] + filtered_source_instances
-                source_containers.append(source_container(program_source,
+                new_source_instances = [copy_instance(source) for source in
+                                        [program_source] + filtered_source_instances]
+                source_containers.append(source_container(new_source_instances[0],
                                                           new_source_instances,
                                                           self.header_instances,
                                                           self.library_dependencies))
@@ -391,686 +620,2369 @@ class file_manager:
         sys.exit(1)
 
 
-class source_container:
+class parse_cache:
 
-    # This class is used for holding source instances, and contains
-    # methods for processing dependencies and extracting relevant
-    # information.
+    # This class stores the parse results of source and header files
+    # in a cache directory, so that files that have not changed since
+    # the previous run don't have to be parsed again. Entries are keyed
+    # by path and instance class, and are validated against the
+    # modification time, size and content hash of the file.
 
-    def __init__(self, program_source, source_instances, header_instances, library_dependencies):
+    # Must be incremented whenever the layout of the cache file changes
+    version = 1
 
-        self.program_source = program_source
-        self.source_instances = source_instances
-        self.header_instances = header_instances
-        self.library_dependencies = library_dependencies
+    def __init__(self, working_dir_path):
 
-    def determine_header_dependencies(self):
+        self.cache_dir = os.path.join(working_dir_path, '.makemake_cache')
+        self.cache_path = os.path.join(self.cache_dir, 'parse_cache.pickle')
 
-        # This method creates a dictionary with source_class instances
-        # as keys. The values are lists of paths to the headers that the
-        # source depends on.
+        self.entries = self.load()
+        self.is_modified = False
 
-        # Find all headers that each header includes
+    def load(self):
 
-        print('Finding header dependencies... ', end='')
+        # This method reads the cache file and returns the stored entries,
+        # or an empty dictionary if the file is missing or outdated.
 
-        header_header_dependencies = {}
+        try:
+            f = open(self.cache_path, 'rb')
+            data = pickle.load(f)
+            f.close()
 
-        for header in self.header_instances:
+        except (IOError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError, IndexError, TypeError, ValueError):
+            return {}
 
-            header_header_dependencies[header] = []
+        if not isinstance(data, dict) or data.get('version') != self.version:
+            return {}
 
-            for header_name in header.included_headers:
+        return data['entries']
 
-                for other_header in self.header_instances:
+    def lookup(self, instance_class, filename_with_path):
 
-                    if header is not other_header and \
-                       header_name == other_header.filename:
+        # This method returns the cached parse results for the given file,
+        # or None if there are no valid results.
 
-                        header_header_dependencies[header].append(other_header)
-                        break
+        key = (filename_with_path, instance_class.__name__)
+        entry = self.entries.get(key)
 
-        # Find all headers that each header dependes on, directly or
-        # indirectly
+        if entry is None or entry['parser_version'] != instance_class.parser_version:
+            return None
 
-        def add_header_dependencies(original_parent, parent):
+        mtime, size = get_file_stats(filename_with_path)
 
-            for child in header_header_dependencies[parent]:
+        if entry['size'] != size:
+            return None
 
-                if not (child is original_parent or
-                        child in header_header_dependencies[original_parent]):
+        if entry['mtime'] != mtime:
 
-                    header_header_dependencies[original_parent].append(child)
+            # The file has been touched, but its content may be the same
 
-                    add_header_dependencies(original_parent, child)
+            if entry['hash'] != get_file_hash(filename_with_path):
+                return None
 
-        for header in self.header_instances:
+            entry['mtime'] = mtime
+            self.is_modified = True
 
-            for child in header_header_dependencies[header]:
+        return entry['parse_results']
 
-                add_header_dependencies(header, child)
+    def get_content_hash(self, instance_class, filename_with_path):
 
-        # Find all headers that each source depends on, directly or
-        # indirectly. Also transfer any dependencies the headers have
-        # to the sources that depend on them
+        # This method returns the content hash stored for the given file.
 
-        source_header_dependencies = {}
+        return self.entries[(filename_with_path, instance_class.__name__)]['hash']
 
-        for source in self.source_instances:
+    def store(self, instance_class, filename_with_path, parse_results):
 
-            source_header_dependencies[source] = []
+        # This method adds the parse results for the given file to the cache.
 
-            for header_name in source.included_headers:
+        mtime, size = get_file_stats(filename_with_path)
 
-                for header in self.header_instances:
+        self.entries[(filename_with_path, instance_class.__name__)] = \
+            {'parser_version': instance_class.parser_version,
+             'mtime': mtime,
+             'size': size,
+             'hash': get_file_hash(filename_with_path),
+             'parse_results': parse_results}
 
-                    if header_name == header.filename:
+        self.is_modified = True
 
-                        for other_header in [header] + header_header_dependencies[header]:
+    def save(self):
 
-                            if other_header.filename_with_path not in \
-                               source_header_dependencies[source]:
+        # This method removes entries for files that no longer exist and
+        # writes the cache to disk.
 
-                                source_header_dependencies[source]\
-                                    .append(other_header.filename_with_path)
+        for key in list(self.entries):
 
-                                source.update_source_information(other_header)
+            if not os.path.isfile(key[0]):
 
-                        break
+                self.entries.pop(key)
+                self.is_modified = True
 
-        print('Done')
+        if not self.is_modified:
+            return
 
-        self.header_dependencies = source_header_dependencies
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
 
-    def process_dependencies(self, unprocessed_object_dependencies):
+            temp_path = '{}.{}'.format(self.cache_path, os.getpid())
 
-        # This method cleans the object dependency dictionary by removing
-        # unnecessary sources and resolving circular dependencies. It also
-        # returns a dependency string for printing.
+            f = open(temp_path, 'wb')
+            pickle.dump({'version': self.version, 'entries': self.entries}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            f.close()
 
-        object_dependencies = unprocessed_object_dependencies.copy()
-        source_instances = list(object_dependencies.keys())
+            os.replace(temp_path, self.cache_path)
 
-        # Remove unnecessary sources
+        except (IOError, OSError):
+            print('\nWarning: could not write parse cache to \"{}\"'
+                  .format(self.cache_path))
 
-        if self.program_source is not None:
+        self.is_modified = False
 
-            print('Removing independent sources... ', end='')
 
-            not_needed = []
+class dependency_state:
 
-            for source in source_instances:
+    # This class stores information from previous runs that is used for
+    # incremental regeneration of makefiles. For each generated makefile
+    # it keeps the content hashes of the files it was generated from, the
+    # dependency edges found between them and its compile rules, so that
+    # the edges of unchanged files can be reused and changes be reported.
 
-                if not source.is_main:
+    # Must be incremented whenever the layout of the state file changes
+    version = 3
 
-                    is_needed = False
+    def __init__(self, cache):
 
-                    for other_source in source_instances:
+        self.cache = cache
+        self.state_path = os.path.join(cache.cache_dir, 'dependency_state.pickle')
 
-                        if other_source is not source:
+        self.outputs = self.load()
 
-                            for source_dependency in object_dependencies[other_source]:
+    def load(self):
 
-                                if source_dependency is source:
-                                    is_needed = True
+        # This method reads the state file and returns the stored output
+        # dictionary, or an empty one if the file is missing or outdated.
 
-                    if not is_needed:
-                        not_needed.append(source)
+        try:
+            f = open(self.state_path, 'rb')
+            data = pickle.load(f)
+            f.close()
 
-            for remove_src in not_needed:
+        except (IOError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError, IndexError, TypeError, ValueError):
+            return {}
 
-                source_instances.remove(remove_src)
-                object_dependencies.pop(remove_src)
+        if not isinstance(data, dict) or data.get('version') != self.version:
+            return {}
 
-            print('Done')
+        return data['outputs']
 
-        # Fix circular dependencies
+    def get_file_hashes(self, sources):
 
-        print('Checking for circular dependencies... ', end='')
+        # This method returns a dictionary with the content hash of each
+        # source and header file in the given source container.
 
-        object_dependencies = cycle_resolver().resolve_cycles(object_dependencies)
+        file_hashes = {}
 
-        print('Done')
+        for instance in sources.source_instances + sources.header_instances:
+            file_hashes[instance.filename_with_path] = \
+                self.cache.get_content_hash(type(instance), instance.filename_with_path)
 
-        # Print dependency list
+        return file_hashes
 
-        dependency_text = '\nList of detected dependencies:'
+    def get_parser_versions(self, sources):
 
-        for source in sorted(object_dependencies,
-                             key=lambda source: len(object_dependencies[source] +
-                                                    self.header_dependencies[source]),
-                             reverse=True):
+        # This method returns a dictionary with the parser version of each
+        # class of instances in the given source container.
 
-            if len(object_dependencies[source] + self.header_dependencies[source]) == 0:
+        return {type(instance).__name__: type(instance).parser_version
+                for instance in sources.source_instances + sources.header_instances}
 
-                dependency_text += '\n' + '\n{}: None'.format(source.filename)
+    def find_previous_edges(self, output_name, sources):
 
-            else:
+        # This method returns the paths of the files that have been changed,
+        # added or removed since the previous run for the given output,
+        # together with the dependency edges found in that run. The edges
+        # are None if they can not be reused, which is the case if the
+        # parse results have a different format, or if the files that
+        # remain are no longer in the same order, since the order of the
+        # dependencies depends on it.
 
-                dependency_text += '\n' + '\n{}:'.format(source.filename)
+        file_hashes = self.get_file_hashes(sources)
 
-                if len(self.header_dependencies[source]) > 0:
-                    dependency_text += '\n' + \
-                        '\n'.join(['-{} [{}]'
-                                   .format(hdr.split(os.sep)[-1],
-                                           source.dependency_descripts[hdr.split(os.sep)[-1]])
-                                   for hdr in self.header_dependencies[source]])
+        if output_name not in self.outputs:
+            return set(file_hashes), None
 
-                if len(object_dependencies[source]) > 0:
-                    dependency_text += '\n' + \
-                        '\n'.join(['-{} [{}]'
-                                   .format(src.filename,
-                                           source.dependency_descripts[src.filename])
-                                   for src in object_dependencies[source]])
+        old_file_hashes = self.outputs[output_name]['file_hashes']
+        edges = self.outputs[output_name]['edges']
 
-        # Convert values from source instances to object names
+        changed_paths = set([path for path in file_hashes
+                             if file_hashes[path] != old_file_hashes.get(path)] +
+                            [path for path in old_file_hashes if path not in file_hashes])
 
-        for source in object_dependencies:
+        if self.outputs[output_name]['parser_versions'] != self.get_parser_versions(sources):
+            return changed_paths, None
 
-            object_dependencies[source] = [src.object_name
-                                           for src in object_dependencies[source]]
+        for instances, old_paths in [(sources.source_instances, edges['source_paths']),
+                                     (sources.header_instances, edges['header_paths'])]:
 
-        self.reduced_source_instances = source_instances
-        self.object_dependencies = object_dependencies
+            paths = [instance.filename_with_path for instance in instances]
+            path_set = set(paths)
+            old_path_set = set(old_paths)
 
-        return dependency_text
+            if [path for path in paths if path in old_path_set] != \
+               [path for path in old_paths if path in path_set]:
+                return changed_paths, None
 
-    def get_internal_libraries(self):
+        return changed_paths, edges
 
-        # This method determines which libraries must be used based
-        # on which libraries the individual sources use.
+    def update_output(self, output_name, sources):
 
-        internal_libraries = {lib: False
-                              for lib in self.reduced_source_instances[0].internal_libraries}
+        # This method compares the files and compile rules used for the
+        # given output with those of the previous run, prints the changes
+        # and stores the new state.
 
-        # Go through all source and header objects and gather information
-        # about which libraries to use and which source has the main function
+        file_hashes = self.get_file_hashes(sources)
 
-        for instance in self.reduced_source_instances + self.header_instances:
+        if output_name not in self.outputs:
 
-            for lib in internal_libraries:
+            print('\nNo previous state for \"{}\", all files are new'.format(output_name))
 
-                internal_libraries[lib] = internal_libraries[lib] or \
-                                           instance.internal_libraries[lib]
+        else:
 
-        return internal_libraries
+            old_file_hashes = self.outputs[output_name]['file_hashes']
+            old_compile_rules = self.outputs[output_name]['compile_rules']
 
-    def get_compile_rules(self):
+            changed_files = [path for path in file_hashes
+                             if path in old_file_hashes and
+                             file_hashes[path] != old_file_hashes[path]]
+            added_files = [path for path in file_hashes if path not in old_file_hashes]
+            removed_files = [path for path in old_file_hashes if path not in file_hashes]
 
-        # This method creates a list of compile rules for all the sources,
-        # making sure that all the dependencies of the sources are taken
-        # into account.
+            changed_rules = [object_name for object_name in sources.compile_rules
+                             if sources.compile_rules[object_name] !=
+                             old_compile_rules.get(object_name)]
+            removed_rules = [object_name for object_name in old_compile_rules
+                             if object_name not in sources.compile_rules]
 
-        compile_rules = []
+            print('\nChanges since previous run:')
 
-        # For each source
-        for source in self.reduced_source_instances:
+            for title, names in [('Changed files', changed_files),
+                                 ('Added files', added_files),
+                                 ('Removed files', removed_files),
+                                 ('Updated compile rules', changed_rules),
+                                 ('Removed compile rules', removed_rules)]:
 
-            dependencies = [header_path.replace(' ', '\ ')
-                            for header_path in self.header_dependencies[source]] \
-                + [library_path.replace(' ', '\ ')
-                   for library_path in self.library_dependencies] \
-                + self.object_dependencies[source]
+                if len(names) > 0:
+                    print('{}:\n'.format(title) +
+                          '\n'.join(['-{}'.format(name.split(os.sep)[-1])
+                                     for name in names]))
 
-            # Update prerequisites section of the main compile rule and add to the list
-            compile_rules.append(source.compile_rule_declr +
-                                 ' '.join(dependencies) + source.compile_rule)
+            if len(changed_files + added_files + removed_files +
+                   changed_rules + removed_rules) == 0:
+                print('None')
 
-        return ''.join(compile_rules)
+        self.outputs[output_name] = {'file_hashes': file_hashes,
+                                     'parser_versions': self.get_parser_versions(sources),
+                                     'edges': sources.dependency_edges,
+                                     'compile_rules': dict(sources.compile_rules)}
 
+    def save(self):
 
-class cycle_resolver:
+        # This method writes the state to disk.
 
-    # This class contains methods for detecting and resolving circular
-    # dependencies in a source dependency dictionary.
+        try:
+            if not os.path.isdir(self.cache.cache_dir):
+                os.makedirs(self.cache.cache_dir)
 
-    def resolve_cycles(self, nodes):
+            temp_path = '{}.{}'.format(self.state_path, os.getpid())
 
-        # This method keeps repeating the cycle detection an resolving
-        # as long as the dependecy tree is being modified.
+            f = open(temp_path, 'wb')
+            pickle.dump({'version': self.version,
+                         'outputs': self.outputs}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            f.close()
 
-        self.nodes = nodes.copy()
-        self.ignore_cycles = []
+            os.replace(temp_path, self.state_path)
 
-        while True:
+        except (IOError, OSError):
+            print('\nWarning: could not write dependency state to \"{}\"'
+                  .format(self.state_path))
 
-            self.run_depth_first_traversal()
 
-            if len(self.cycle_nodes_list) > 0:
+class source_container:
 
-                self.fix_cycle()
+    # This class is used for holding source instances, and contains
+    # methods for processing dependencies and extracting relevant
+    # information. For a combined makefile, the container holds the
+    # sources of all the programs, which are given as a list of program
+    # sources.
 
-            else:
+    def __init__(self, program_source, source_instances, header_instances, library_dependencies,
+                 program_sources=None):
 
-                break
+        self.program_source = program_source
+        self.program_sources = program_sources
+        self.source_instances = source_instances
+        self.header_instances = header_instances
+        self.library_dependencies = library_dependencies
+        self.records_edges = False
+        self.previous_edges = None
+        self.changed_paths = set()
+        self.changed_header_names = set()
+        self.reused_header_lists = {}
 
-        return self.nodes
+    def use_previous_edges(self, state, output_name):
 
-    def run_depth_first_traversal(self):
+        # This method makes the dependency edges found for the given output
+        # in the previous run available for reuse, and makes sure that the
+        # edges found in this run are recorded. The names of headers that
+        # have been added or removed are collected, since includes of these
+        # names may now be resolved differently.
 
-        # This runs the cycle detection with every node as a root.
+        self.records_edges = True
+        self.changed_paths, self.previous_edges = state.find_previous_edges(output_name, self)
 
-        self.cycle_nodes_list = []
-        self.cycle_nodes = []
-        self.visited = {}
-        self.start = {}
+        if self.previous_edges is not None:
 
-        for node in self.nodes:
+            header_paths = set([header.filename_with_path for header in self.header_instances])
+            old_header_paths = set(self.previous_edges['header_paths'])
 
-            self.visited[node] = False
-            self.start[node] = False
+            self.changed_header_names = set([path.split(os.sep)[-1] for path
+                                             in header_paths.symmetric_difference(old_header_paths)])
 
-        for node in self.nodes:
+    def find_reusable_header_closures(self, positions):
 
-            self.start_node = node
-            self.depth_first_traversal(node, is_not_first=False)
-            self.start[node] = True
+        # This method returns the reachable headers found in the previous
+        # run, as bitsets of the given header positions, for the headers
+        # that are not affected by any changes. A header is affected if it,
+        # or any header it depends on, has been changed, added or removed,
+        # or includes a header with the name of an added or removed header.
 
-        self.cycle_nodes_list = sorted(self.cycle_nodes_list, key=len)
+        reachable_headers = {}
 
-    def depth_first_traversal(self, node, is_not_first=True):
+        if self.previous_edges is None:
+            return reachable_headers
 
-        # This method traverses the dependency graph recursively from
-        # a certain node and finds cycles rooted on that node. The nodes
-        # involved in the cycles are added to a list.
+        old_header_paths = self.previous_edges['header_paths']
+        old_header_closures = self.previous_edges['header_closures']
 
-        if not self.start[node]:
+        path_positions = {}
 
-            if self.visited[node]:
+        for header in self.header_instances:
+            path_positions.setdefault(header.filename_with_path, positions[header])
 
-                if node == self.start_node:
+        new_positions = [path_positions.get(path) for path in old_header_paths]
+        is_same_order = new_positions == list(range(len(self.header_instances)))
 
-                    cycle_nodes_complete = [node] + self.cycle_nodes
+        removed_bits = 0
 
-                    if cycle_nodes_complete not in self.ignore_cycles:
-                        self.cycle_nodes_list.append(cycle_nodes_complete)
+        for old_position, new_position in enumerate(new_positions):
+            if new_position is None:
+                removed_bits |= 1 << old_position
 
-            else:
+        affected_bits = 0
 
-                self.visited[node] = True
+        for header in self.header_instances:
 
-                for child in self.nodes[node]:
+            if header.filename_with_path in self.changed_paths or \
+               any([name in self.changed_header_names for name in header.included_headers]):
 
-                    if is_not_first:
-                        self.cycle_nodes.append(node)
+                affected_bits |= 1 << positions[header]
 
-                    self.depth_first_traversal(child)
+        for header in self.header_instances:
 
-                    self.cycle_nodes = self.cycle_nodes[:-1]
+            old_bits = old_header_closures.get(header.filename_with_path)
 
-                self.visited[node] = False
+            if old_bits is None or old_bits & removed_bits:
+                continue
 
-    def fix_cycle(self):
+            if is_same_order:
+                bits = old_bits
 
-        # This method informs the use about circular dependecies and
-        # ask for how to resolve them.
+            else:
 
-        for cycle_nodes in self.cycle_nodes_list:
+                bits = 0
 
-            idx_list = range(1, len(cycle_nodes)+1)
-            idx_str_list = [str(i) for i in idx_list]
-            ans_list = idx_str_list + ['a', 'i']
+                while old_bits:
 
-            print('\nWarning: circular dependency detected:\n{}( <-{} ...)'
-                  .format(' <- '.join([node.filename for node in cycle_nodes]),
-                          cycle_nodes[0].filename))
+                    lowest_bit = old_bits & -old_bits
+                    bits |= 1 << new_positions[lowest_bit.bit_length() - 1]
+                    old_bits ^= lowest_bit
 
-            ans = ''
-            while ans not in ans_list:
-                ans = input('Which dependency to drop? ' +
-                            '[<n>: drop file # n <-, a: abort, i: ignore]\n').lower()
+            if not (bits | (1 << positions[header])) & affected_bits:
+                reachable_headers[header] = bits
 
-            if ans in idx_str_list:
+        return reachable_headers
 
-                idx1 = int(ans)-1
-                idx2 = idx1 + 1 if idx1 < len(cycle_nodes) - 1 else 0
+    def find_reusable_header_lists(self, reused_headers):
 
-                parent = cycle_nodes[idx1]
-                child = cycle_nodes[idx2]
+        # This method returns the lists of header paths found in the
+        # previous run for the sources that are unchanged, do not include
+        # a header with the name of an added or removed header, and only
+        # depend on headers whose reachable headers were reused.
 
-                print('Dropping dependency {} <- {}'
-                      .format(parent.filename, child.filename))
+        header_lists = {}
 
-                self.nodes[parent].remove(child)
+        if self.previous_edges is None:
+            return header_lists
 
-            elif ans == 'a':
+        old_header_dependencies = self.previous_edges['header_dependencies']
 
-                abort()
+        reused_paths = set([header.filename_with_path for header in reused_headers])
 
-            elif ans == 'i':
+        for source in self.source_instances:
 
-                print('Ignoring circular dependency')
-                self.ignore_cycles.append(cycle_nodes)
+            path = source.filename_with_path
 
+            if path in self.changed_paths or path not in old_header_dependencies or \
+               any([name in self.changed_header_names for name in source.included_headers]):
                 continue
 
-            break
+            if all([header_path in reused_paths for header_path in old_header_dependencies[path]]):
+                header_lists[source] = old_header_dependencies[path]
 
+        return header_lists
 
-class file_writer:
+    def find_reusable_object_dependencies(self):
 
-    # This class contains methods for writing a makefile text.
+        # This method returns a dictionary with the object dependencies
+        # found in the previous run, as lists of sources, and the
+        # corresponding dependency descriptions for the sources whose
+        # object dependencies can not have changed. The dependencies of a
+        # source may have changed if the source, or a header it depends
+        # on, has changed, or if it uses a name provided by such a source
+        # or by an added or removed source, before or after the change.
 
-    def __init__(self, working_dir_path):
+        reusable_dependencies = {}
 
-        self.working_dir_path = working_dir_path
+        if self.previous_edges is None:
+            return reusable_dependencies
 
-    def save_makefile(self, makefile, output_name):
+        old_object_dependencies = self.previous_edges['object_dependencies']
+        old_provided_names = self.previous_edges['provided_names']
 
-        # This method saves the generated makefile text to a file, while
-        # managing any existing makefiles to avoid conflicts.
+        sources_by_path = {source.filename_with_path: source for source in self.source_instances}
 
-        filename = 'makefile'
-        makefilepath = os.path.join(self.working_dir_path, filename)
+        changed_filenames = set([path.split(os.sep)[-1] for path in self.changed_paths])
 
-        if os.path.exists(makefilepath):
+        affected_sources = set()
+        changed_names = set()
 
-            f = open(makefilepath, 'r')
-            lines = f.readlines()
-            f.close()
+        for source in self.source_instances:
 
-            is_wrapper = False
-            other_output_name = None
+            if source.filename_with_path in self.changed_paths or \
+               source not in self.reused_header_lists or \
+               any([header_name in changed_filenames for header_name in source.included_headers]):
 
-            for line in lines:
+                affected_sources.add(source)
+                changed_names.update(source.get_provided_names())
+                changed_names.update(old_provided_names.get(source.filename_with_path, []))
 
-                stripped = line.strip()
+        for path in self.changed_paths:
+            changed_names.update(old_provided_names.get(path, []))
 
-                if stripped == '#$wrapper':
+        for source in self.source_instances:
 
-                    is_wrapper = True
-                    break
+            path = source.filename_with_path
 
-                elif len(stripped) > 2 and stripped[:2] == '#@':
+            if source in affected_sources or path not in old_object_dependencies or \
+               any([name in changed_names for name in source.get_used_names()]):
+                continue
 
-                    other_output_name = stripped[2:]
-                    break
+            dependency_paths, dependency_descripts = old_object_dependencies[path]
 
-            if is_wrapper:
+            if all([dependency_path in sources_by_path for dependency_path in dependency_paths]):
+                reusable_dependencies[source] = ([sources_by_path[dependency_path]
+                                                  for dependency_path in dependency_paths],
+                                                 dependency_descripts)
 
-                print('\nThere exists a makefile wrapper in this directory')
+        return reusable_dependencies
 
-                ans = ''
-                while ans not in ['o', 'n', 'w', 'a']:
-                    ans = input('How to proceed? [o: overwrite wrapper, ' +
-                                'n: set custom name, w: include in wrapper, a: abort]\n').lower()
+    def record_dependency_edges(self, object_dependencies):
 
-                if ans == 'o':
+        # This method stores the dependency edges found in this run, so that
+        # they can be reused in the next run. The reachable headers of each
+        # header are stored as bitsets of the header positions, and the
+        # object dependencies of each source together with the dependency
+        # descriptions they added.
 
-                    print('Overwriting makefile wrapper... ', end='')
+        header_closures = {}
 
-                    f = open(makefilepath, 'w')
-                    f.write(makefile)
-                    f.close()
+        for header in self.header_instances:
+            header_closures.setdefault(header.filename_with_path, self.reachable_headers[header])
+
+        self.dependency_edges = \
+            {'source_paths': [source.filename_with_path for source in self.source_instances],
+             'header_paths': [header.filename_with_path for header in self.header_instances],
+             'header_closures': header_closures,
+             'header_dependencies': {source.filename_with_path: list(self.header_dependencies[source])
+                                     for source in self.source_instances},
+             'object_dependencies': {source.filename_with_path:
+                                     ([other_source.filename_with_path
+                                       for other_source in object_dependencies[source]],
+                                      {other_source.filename: source.dependency_descripts[other_source.filename]
+                                       for other_source in object_dependencies[source]})
+                                     for source in self.source_instances},
+             'provided_names': {source.filename_with_path: source.get_provided_names()
+                                for source in self.source_instances}}
 
-                    print('Done')
+    def determine_header_dependencies(self):
 
-                elif ans == 'n':
+        # This method creates a dictionary with source_class instances
+        # as keys. The values are lists of paths to the headers that the
+        # source depends on.
 
-                    filename = input('Input new makefile name:\n')
-                    self.write_new_file(makefile, filename)
+        # Find all headers that each header includes
 
-                elif ans == 'w':
+        print('Finding header dependencies... ', end='')
 
-                    makefile_name = '{}.mk'.format(output_name)
+        headers_by_filename = {}
 
-                    self.write_new_file(makefile, makefile_name)
+        for header in self.header_instances:
+            headers_by_filename.setdefault(header.filename, []).append(header)
 
-                    self.generate_wrapper()
+        header_header_dependencies = {}
 
-                elif ans == 'a':
+        for header in self.header_instances:
 
-                    abort()
+            header_header_dependencies[header] = []
 
-            elif other_output_name is not None and \
-                 output_name != other_output_name:
+            for header_name in header.included_headers:
 
-                print('\nThere already exists a default ' +
-                      'generated makefile for another output file')
+                for other_header in headers_by_filename.get(header_name, []):
 
-                ans = ''
-                while ans not in ['o', 'n', 'w', 'a']:
-                    ans = input('How to proceed? [o: overwrite, ' +
-                                'n: set custom name, w: create wrapper, a: abort]\n').lower()
+                    if header is not other_header:
 
-                if ans == 'o':
+                        header_header_dependencies[header].append(other_header)
+                        break
 
-                    print('Overwriting old makefile... ', end='')
+        # Find all headers that each header dependes on, directly or
+        # indirectly. The reachable headers are stored as bitsets of header
+        # positions. Every component of headers including each other
+        # circularly is handled once, after all the components it depends
+        # on, so each shared header is only expanded once. The reachable
+        # headers found in the previous run are reused for the headers
+        # that are not affected by any changes.
 
-                    f = open(makefilepath, 'w')
-                    f.write(makefile)
-                    f.close()
+        positions = {header: i for i, header in enumerate(self.header_instances)}
 
-                    print('Done')
+        reachable_headers = self.find_reusable_header_closures(positions)
+        reused_headers = set(reachable_headers)
 
-                elif ans == 'n':
+        affected_headers = [header for header in self.header_instances
+                            if header not in reused_headers]
+
+        for component in find_strongly_connected_components(header_header_dependencies,
+                                                            affected_headers):
+
+            component_bits = 0
+
+            for header in component:
+                component_bits |= 1 << positions[header]
+
+            reachable_bits = component_bits if len(component) > 1 else 0
+
+            for header in component:
+
+                for child in header_header_dependencies[header]:
+
+                    if not (component_bits >> positions[child]) & 1:
+                        reachable_bits |= (1 << positions[child]) | reachable_headers[child]
+
+            for header in component:
+                reachable_headers[header] = reachable_bits
+
+        self.reachable_headers = reachable_headers
+
+        # List the headers each header depends on, with the directly
+        # included ones first
+
+        header_dependency_lists = {}
+
+        def get_header_dependency_list(header):
+
+            if header not in header_dependency_lists:
+
+                dependency_list = remove_duplicates(header_header_dependencies[header])
+                remaining_bits = reachable_headers[header] & ~(1 << positions[header])
+
+                for child in dependency_list:
+                    remaining_bits &= ~(1 << positions[child])
+
+                while remaining_bits:
+
+                    lowest_bit = remaining_bits & -remaining_bits
+                    dependency_list.append(self.header_instances[lowest_bit.bit_length() - 1])
+                    remaining_bits ^= lowest_bit
+
+                header_dependency_lists[header] = dependency_list
+
+            return header_dependency_lists[header]
+
+        # Find all headers that each source depends on, directly or
+        # indirectly. Also transfer any dependencies the headers have
+        # to the sources that depend on them. The headers found in the
+        # previous run are reused for the sources that only depend on
+        # headers whose reachable headers were reused.
+
+        self.reused_header_lists = self.find_reusable_header_lists(reused_headers)
+
+        headers_by_path = {}
+
+        for header in self.header_instances:
+            headers_by_path.setdefault(header.filename_with_path, header)
+
+        source_header_dependencies = {}
+
+        for source in self.source_instances:
+
+            if source in self.reused_header_lists:
+
+                source_header_dependencies[source] = list(self.reused_header_lists[source])
+
+                for header_path in source_header_dependencies[source]:
+                    source.update_source_information(headers_by_path[header_path])
+
+                continue
+
+            source_header_dependencies[source] = []
+            added_paths = set()
+
+            for header_name in source.included_headers:
+
+                if header_name in headers_by_filename:
+
+                    header = headers_by_filename[header_name][0]
+
+                    # The dependencies of an added header have already
+                    # been added with it
+                    if header.filename_with_path in added_paths:
+                        continue
+
+                    for other_header in [header] + get_header_dependency_list(header):
+
+                        if other_header.filename_with_path not in added_paths:
+
+                            source_header_dependencies[source]\
+                                .append(other_header.filename_with_path)
+                            added_paths.add(other_header.filename_with_path)
+
+                            source.update_source_information(other_header)
+
+        print('Done')
+
+        if self.previous_edges is not None:
+            print('Reused the header dependencies of {} of {} sources'
+                  .format(len(self.reused_header_lists), len(self.source_instances)))
+
+        self.header_dependencies = source_header_dependencies
+
+    def process_dependencies(self, unprocessed_object_dependencies, cycle_policy=None):
+
+        # This method cleans the object dependency dictionary by removing
+        # unnecessary sources and resolving circular dependencies. It also
+        # returns a dependency string for printing.
+
+        if self.records_edges:
+            self.record_dependency_edges(unprocessed_object_dependencies)
+
+        object_dependencies = unprocessed_object_dependencies.copy()
+        source_instances = list(object_dependencies.keys())
+
+        # Remove sources that no program depends on, directly or indirectly
+
+        if self.program_sources is not None:
+            root_sources = self.program_sources
+        elif self.program_source is not None:
+            root_sources = [self.program_source]
+        else:
+            root_sources = None
+
+        if root_sources is not None:
+
+            print('Removing independent sources... ', end='')
+
+            used_sources = find_reachable_sources(object_dependencies, root_sources)
+
+            removed_sources = [source for source in source_instances
+                               if source not in used_sources]
+            source_instances = [source for source in source_instances
+                                if source in used_sources]
+
+            for remove_src in removed_sources:
+                object_dependencies.pop(remove_src)
+
+            print('Done')
+
+            if len(removed_sources) > 0:
+
+                removed_size = sum([get_file_stats(source.filename_with_path)[1]
+                                    for source in removed_sources])
+
+                print('Excluded {} object{} ({:.1f} kB of source text):\n'
+                      .format(len(removed_sources),
+                              '' if len(removed_sources) == 1 else 's',
+                              removed_size/1024) +
+                      '\n'.join(['-{} ({})'.format(source.object_name, source.filename)
+                                 for source in removed_sources]))
+
+        # Fix circular dependencies
+
+        print('Checking for circular dependencies... ', end='')
+
+        object_dependencies = cycle_resolver(cycle_policy).resolve_cycles(object_dependencies)
+
+        print('Done')
+
+        # Print dependency list
+
+        dependency_text = '\nList of detected dependencies:'
+
+        for source in sorted(object_dependencies,
+                             key=lambda source: len(object_dependencies[source] +
+                                                    self.header_dependencies[source]),
+                             reverse=True):
+
+            if len(object_dependencies[source] + self.header_dependencies[source]) == 0:
+
+                dependency_text += '\n' + '\n{}: None'.format(source.filename)
+
+            else:
+
+                dependency_text += '\n' + '\n{}:'.format(source.filename)
+
+                if len(self.header_dependencies[source]) > 0:
+                    dependency_text += '\n' + \
+                        '\n'.join(['-{} [{}]'
+                                   .format(hdr.split(os.sep)[-1],
+                                           source.dependency_descripts[hdr.split(os.sep)[-1]])
+                                   for hdr in self.header_dependencies[source]])
+
+                if len(object_dependencies[source]) > 0:
+                    dependency_text += '\n' + \
+                        '\n'.join(['-{} [{}]'
+                                   .format(src.filename,
+                                           source.dependency_descripts[src.filename])
+                                   for src in object_dependencies[source]])
+
+        # Find the object files of each program in a combined makefile
+
+        if self.program_sources is not None:
+
+            self.program_object_files = []
+
+            for program_source in self.program_sources:
+
+                used_sources = find_reachable_sources(object_dependencies, [program_source])
+
+                self.program_object_files.append((program_source.executable_name,
+                                                  [program_source.object_name] +
+                                                  [source.object_name for source in source_instances
+                                                   if source in used_sources and
+                                                   source is not program_source]))
+
+        # Convert values from source instances to object names
+
+        for source in object_dependencies:
+
+            object_dependencies[source] = [src.object_name
+                                           for src in object_dependencies[source]]
+
+        self.reduced_source_instances = source_instances
+        self.object_dependencies = object_dependencies
+
+        return dependency_text
+
+    def select_precompiled_headers(self, max_headers):
+
+        # This method selects up to the given number of headers to
+        # precompile, and assigns one of them to each source including it.
+        # Headers are ranked by the number of sources that include them,
+        # directly or indirectly, times the size of the header and all the
+        # headers it includes. Only headers that are included by more than
+        # one source and are protected against repeated inclusion are
+        # considered, and a source can only use one precompiled header.
+
+        print('Selecting headers to precompile... ', end='')
+
+        n_including_sources = collections.Counter()
+
+        for source in self.reduced_source_instances:
+            n_including_sources.update(self.header_dependencies[source])
+
+        candidates = []
+
+        for position, header in enumerate(self.header_instances):
+
+            n_sources = n_including_sources[header.filename_with_path]
+
+            if n_sources < 2:
+                continue
+
+            total_size = os.path.getsize(header.filename_with_path)
+            remaining_bits = self.reachable_headers[header] & ~(1 << position)
+
+            while remaining_bits:
+
+                lowest_bit = remaining_bits & -remaining_bits
+                total_size += os.path.getsize(self.header_instances[lowest_bit.bit_length() - 1]
+                                              .filename_with_path)
+                remaining_bits ^= lowest_bit
+
+            candidates.append((n_sources*total_size, position, header))
+
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+
+        selected_headers = []
+        selected_filenames = set()
+
+        for _, _, header in candidates:
+
+            if len(selected_headers) == max_headers:
+                break
+
+            # Precompiled headers are named after the header, so the
+            # filenames must be unique
+            if header.filename in selected_filenames or not has_include_guard(header):
+                continue
+
+            selected_headers.append(header)
+            selected_filenames.add(header.filename)
+
+        # Assign the highest ranked header to each source, and drop the
+        # headers that end up being used by a single source until every
+        # remaining header is shared
+
+        while True:
+
+            self.precompiled_headers = {}
+
+            for source in self.reduced_source_instances:
+
+                included_paths = set(self.header_dependencies[source])
+
+                for header in selected_headers:
+
+                    if header.filename_with_path in included_paths:
+                        self.precompiled_headers[source] = header
+                        break
+
+            n_using_sources = collections.Counter(self.precompiled_headers.values())
+
+            shared_headers = [header for header in selected_headers
+                              if n_using_sources[header] > 1]
+
+            if len(shared_headers) == len(selected_headers):
+                break
+
+            selected_headers = shared_headers
+
+        print('Done')
+
+        if len(selected_headers) > 0:
+            print('Precompiled headers:\n' +
+                  '\n'.join(['-{} (used by {} sources)'.format(header.filename,
+                                                               n_using_sources[header])
+                             for header in selected_headers]))
+
+    def form_unity_batches(self, byte_budget):
+
+        # This method groups the sources into batches that are compiled as
+        # single translation units, through generated sources including
+        # them. Only sources in the same directory, and in a combined
+        # makefile only sources used by the same programs, are grouped, and
+        # a new batch is started when the total size of the sources would
+        # exceed the given number of bytes (zero means no limit). Sources
+        # defining the same file-scope names, or including the same header
+        # without an include guard, are kept apart, and sources defining
+        # macros before including headers are compiled on their own. A
+        # source is never added to a batch that would make the dependencies
+        # between the objects circular. The batches replace their sources
+        # in the list of sources and in the dependencies.
+
+        print('Forming unity batches... ', end='')
+
+        sources_by_object_name = {source.object_name: source
+                                  for source in self.reduced_source_instances}
+
+        # Order the sources so that each source comes after the sources it
+        # depends on
+
+        ordered_sources = []
+        visited_sources = set()
+
+        for root_source in self.reduced_source_instances:
+
+            if root_source in visited_sources:
+                continue
+
+            visited_sources.add(root_source)
+            work_stack = [(root_source, iter(self.object_dependencies[root_source]))]
+
+            while len(work_stack) > 0:
+
+                source, object_names = work_stack[-1]
+
+                for object_name in object_names:
+
+                    dependency = sources_by_object_name[object_name]
+
+                    if dependency not in visited_sources:
+
+                        visited_sources.add(dependency)
+                        work_stack.append((dependency, iter(self.object_dependencies[dependency])))
+                        break
+
+                else:
+                    work_stack.pop()
+                    ordered_sources.append(source)
+
+        if self.program_sources is not None:
+            using_programs = {source: frozenset([executable_name for executable_name, object_names
+                                                 in self.program_object_files
+                                                 if source.object_name in object_names])
+                              for source in ordered_sources}
+        else:
+            using_programs = {}
+
+        unguarded_header_paths = set([header.filename_with_path for header in self.header_instances
+                                      if not has_include_guard(header)])
+
+        # Add each source to the open batch for its directory if possible
+
+        batch_members = []
+        batch_sizes = []
+        batch_names = []
+        batch_headers = []
+        batch_dependencies = []
+        source_batches = {}
+        open_batches = {}
+
+        def depends_on_batch(start_batches, batch):
+
+            # This function checks whether the given batch can be reached
+            # from any of the start batches.
+
+            queue = collections.deque(start_batches)
+            visited_batches = set(start_batches)
+
+            while len(queue) > 0:
+
+                current_batch = queue.popleft()
+
+                if current_batch == batch:
+                    return True
+
+                for dependency in batch_dependencies[current_batch]:
+                    if dependency not in visited_batches:
+                        visited_batches.add(dependency)
+                        queue.append(dependency)
+
+            return False
+
+        for source in ordered_sources:
+
+            key = (os.path.dirname(source.filename_with_path), using_programs.get(source))
+            batch = open_batches.get(key)
+
+            size = os.path.getsize(source.filename_with_path)
+            names = set(source.file_scope_names)
+            headers = unguarded_header_paths.intersection(self.header_dependencies[source])
+            dependencies = set([source_batches[sources_by_object_name[object_name]]
+                                for object_name in self.object_dependencies[source]
+                                if sources_by_object_name[object_name] in source_batches])
+
+            fits_in_batch = batch is not None and \
+                not source.configures_headers and \
+                (byte_budget == 0 or batch_sizes[batch] + size <= byte_budget) and \
+                names.isdisjoint(batch_names[batch]) and \
+                headers.isdisjoint(batch_headers[batch]) and \
+                not depends_on_batch(dependencies - set([batch]), batch)
+
+            if not fits_in_batch:
+
+                batch = len(batch_members)
+
+                batch_members.append([])
+                batch_sizes.append(0)
+                batch_names.append(set())
+                batch_headers.append(set())
+                batch_dependencies.append(set())
+
+                if source.configures_headers:
+                    open_batches.pop(key, None)
+                else:
+                    open_batches[key] = batch
+
+            batch_members[batch].append(source)
+            batch_sizes[batch] += size
+            batch_names[batch].update(names)
+            batch_headers[batch].update(headers)
+            batch_dependencies[batch].update(dependencies - set([batch]))
+            source_batches[source] = batch
+
+        # Create the batches with more than one source, with names that
+        # do not clash with the objects of other sources
+
+        batches = {}
+        batch_number = 0
+
+        for members in batch_members:
+
+            if len(members) < 2:
+                continue
+
+            batch_number += 1
+
+            while 'unity_{}.o'.format(batch_number) in sources_by_object_name:
+                batch_number += 1
+
+            unity_source = unity_batch('unity_{}'.format(batch_number),
+                                       sorted(members, key=self.reduced_source_instances.index))
+
+            for source in members:
+                batches[source] = unity_source
+
+        # Replace the sources in the batches with the batches
+
+        source_instances = remove_duplicates([batches.get(source, source)
+                                              for source in self.reduced_source_instances])
+
+        object_dependencies = {}
+
+        for source in source_instances:
+
+            members = source.sources if isinstance(source, unity_batch) else [source]
+
+            if isinstance(source, unity_batch):
+                self.header_dependencies[source] = \
+                    remove_duplicates([member.filename_with_path for member in members] +
+                                      sum([self.header_dependencies[member] for member in members], []))
+
+            object_dependencies[source] = \
+                remove_duplicates([batches.get(sources_by_object_name[object_name],
+                                               sources_by_object_name[object_name]).object_name
+                                   for member in members
+                                   for object_name in self.object_dependencies[member]])
+
+            if source.object_name in object_dependencies[source]:
+                object_dependencies[source].remove(source.object_name)
+
+        if self.program_sources is not None:
+            self.program_object_files = [(executable_name,
+                                          remove_duplicates([batches.get(sources_by_object_name[object_name],
+                                                                         sources_by_object_name[object_name])
+                                                             .object_name
+                                                             for object_name in object_names]))
+                                         for executable_name, object_names in self.program_object_files]
+
+        self.reduced_source_instances = source_instances
+        self.object_dependencies = object_dependencies
+
+        print('Done')
+
+        unity_sources = remove_duplicates(list(batches.values()))
+
+        if len(unity_sources) > 0:
+            print('Unity batches:\n' +
+                  '\n'.join(['-{} ({})'.format(unity_source.filename,
+                                               ', '.join([member.filename
+                                                          for member in unity_source.sources]))
+                             for unity_source in unity_sources]))
+
+    def get_internal_libraries(self):
+
+        # This method determines which libraries must be used based
+        # on which libraries the individual sources use.
+
+        internal_libraries = {lib: False
+                              for lib in self.reduced_source_instances[0].internal_libraries}
+
+        # Go through all source and header objects and gather information
+        # about which libraries to use and which source has the main function
+
+        for instance in self.reduced_source_instances + self.header_instances:
+
+            for lib in internal_libraries:
+
+                internal_libraries[lib] = internal_libraries[lib] or \
+                                           instance.internal_libraries[lib]
+
+        return internal_libraries
+
+    def get_compile_rules(self, include_headers=True, use_build_directory=False,
+                          signature_path=None):
+
+        # This method creates a list of compile rules for all the sources,
+        # making sure that all the dependencies of the sources are taken
+        # into account. Header dependencies can be left out when they are
+        # tracked by the compiler instead. If a build directory is used,
+        # the directory for object files is added as an order-only
+        # prerequisite. If a flag signature is given, all objects depend
+        # on it.
+
+        compile_rules = []
+        self.compile_rules = {}
+
+        # For each source
+        for source in self.reduced_source_instances:
+
+            dependencies = [header_path.replace(' ', '\ ')
+                            for header_path in self.header_dependencies[source]
+                            if include_headers] \
+                + [library_path.replace(' ', '\ ')
+                   for library_path in self.library_dependencies] \
+                + ([signature_path] if signature_path is not None else [])
+
+            # Object files that are only needed for linking are added as
+            # order-only prerequisites if the source class specifies it
+            object_paths = [get_object_path(object_name, use_build_directory)
+                            for object_name in self.object_dependencies[source]]
+            order_only_paths = [object_directory] if use_build_directory else []
+
+            if source.order_only_object_dependencies:
+                order_only_paths = object_paths + order_only_paths
+            else:
+                dependencies += object_paths
+
+            if len(order_only_paths) > 0:
+                dependencies += ['|'] + order_only_paths
+
+            # Update prerequisites section of the main compile rule and add to the list
+            compile_rules.append(source.compile_rule_declr +
+                                 ' '.join(dependencies) + source.compile_rule)
+
+            self.compile_rules[source.object_name] = compile_rules[-1]
+
+        return ''.join(compile_rules)
+
+
+class unity_batch:
+
+    # This class holds a group of sources that are compiled together as a
+    # single translation unit, through a generated source including all of
+    # them. It has the same attributes as the sources, so that it can take
+    # their place when the compile rules are created.
+
+    def __init__(self, name, sources):
+
+        self.name = name
+        self.sources = sources
+
+        self.filename = name + '.' + sources[0].filename.split('.')[-1]
+        self.object_name = name + '.o'
+        self.order_only_object_dependencies = sources[0].order_only_object_dependencies
+
+        self.internal_libraries = {lib: any([source.internal_libraries[lib] for source in sources])
+                                   for lib in sources[0].internal_libraries}
+
+        self.create_compile_rule()
+
+    def create_compile_rule(self, use_build_directory=False, precompiled_header=None):
+
+        # This method creates the compilation rule for the generated source
+        # in the same way as for the sources in the batch.
+
+        self.filename_with_path = get_object_path('unity', use_build_directory) + \
+            object_path_separator + self.filename
+
+        type(self.sources[0]).create_compile_rule(self,
+                                                  use_build_directory=use_build_directory,
+                                                  precompiled_header=precompiled_header)
+
+
+class cycle_resolver:
+
+    # This class contains methods for detecting and resolving circular
+    # dependencies in a source dependency dictionary. The cycles are found
+    # by determining the strongly connected components of the dependency
+    # graph, which takes time proportional to the number of sources and
+    # dependencies. If a policy is given, cycles are resolved according
+    # to it instead of asking.
+
+    def __init__(self, policy=None):
+
+        self.policy = policy
+
+    def resolve_cycles(self, nodes):
+
+        # This method reports one cycle for each group of sources that
+        # depend circularly on each other, and asks how to resolve it. When
+        # a dependency is dropped, only the group it belonged to is checked
+        # again. When the cycle is ignored, all cycles in the group are.
+
+        self.nodes = nodes.copy()
+
+        components = self.find_cyclic_components(list(self.nodes))
+
+        while len(components) > 0:
+
+            component = components.pop(0)
+
+            if self.fix_cycle(self.find_cycle(component)):
+                components = self.find_cyclic_components(component) + components
+
+        return self.nodes
+
+    def find_cyclic_components(self, node_list):
+
+        # This method finds the strongly connected components of the part
+        # of the graph containing the given nodes. The components that
+        # contain cycles are returned, ordered by the first occurence of
+        # their nodes in the given list.
+
+        positions = {node: i for i, node in enumerate(node_list)}
+
+        components = [sorted(component, key=positions.get) for component
+                      in find_strongly_connected_components(self.nodes, node_list)
+                      if len(component) > 1 or component[0] in self.nodes[component[0]]]
+
+        return sorted(components, key=lambda component: positions[component[0]])
+
+    def find_cycle(self, component):
+
+        # This method returns a shortest cycle through the first node of
+        # the given strongly connected component, found by a single
+        # breadth-first search from that node, or a node that depends on
+        # itself. The cycle is a list of nodes where each node depends on
+        # the next, and the last node depends on the first.
+
+        for node in component:
+            if node in self.nodes[node]:
+                return [node]
+
+        start = component[0]
+        in_component = set(component)
+
+        previous = {start: None}
+        queue = collections.deque([start])
+
+        while len(queue) > 0:
+
+            node = queue.popleft()
+
+            for child in self.nodes[node]:
+
+                if child is start:
+
+                    cycle_nodes = []
+
+                    while node is not None:
+
+                        cycle_nodes.append(node)
+                        node = previous[node]
+
+                    cycle_nodes.reverse()
+
+                    return cycle_nodes
+
+                if child in in_component and child not in previous:
+
+                    previous[child] = node
+                    queue.append(child)
+
+    def count_references(self, parent, child):
+
+        # This method returns the number of modules and procedures through
+        # which the parent source depends on the child source.
+
+        return len(parent.dependency_descripts.get(child.filename, '').split(','))
+
+    def fix_cycle(self, cycle_nodes):
+
+        # This method informs the user about a circular dependency and
+        # asks for how to resolve it. It returns True if a dependency was
+        # dropped. With the "drop" policy, the dependency through the
+        # fewest modules and procedures is dropped.
+
+        idx_list = range(1, len(cycle_nodes)+1)
+        idx_str_list = [str(i) for i in idx_list]
+        ans_list = idx_str_list + ['a', 'i']
+
+        print('\nWarning: circular dependency detected:\n{}( <-{} ...)'
+              .format(' <- '.join([node.filename for node in cycle_nodes]),
+                      cycle_nodes[0].filename))
+
+        if self.policy == 'drop':
+
+            n_references = [self.count_references(cycle_nodes[i],
+                                                  cycle_nodes[(i + 1) % len(cycle_nodes)])
+                            for i in range(len(cycle_nodes))]
+
+            policy_answer = str(n_references.index(min(n_references)) + 1)
+
+        else:
+            policy_answer = {'ignore': 'i', 'fail': 'a'}.get(self.policy)
+
+        ans = get_answer('Which dependency to drop? ' +
+                         '[<n>: drop file # n <-, a: abort, ' +
+                         'i: ignore all circular dependencies between these sources]\n',
+                         ans_list,
+                         policy_answer)
+
+        if ans in idx_str_list:
+
+            idx1 = int(ans)-1
+            idx2 = idx1 + 1 if idx1 < len(cycle_nodes) - 1 else 0
+
+            parent = cycle_nodes[idx1]
+            child = cycle_nodes[idx2]
+
+            print('Dropping dependency {} <- {}'
+                  .format(parent.filename, child.filename))
+
+            self.nodes[parent].remove(child)
+
+            return True
+
+        elif ans == 'a':
+
+            abort()
+
+        print('Ignoring circular dependencies between these sources')
+
+        return False
+
+
+class file_writer:
+
+    # This class contains methods for writing a makefile text. If a policy
+    # for existing makefiles is given, conflicts are resolved according to
+    # it instead of asking. Wrappers are made non-recursive if specified.
+
+    def __init__(self, working_dir_path, policy=None, non_recursive_wrapper=False):
+
+        self.working_dir_path = working_dir_path
+        self.policy = policy
+        self.non_recursive_wrapper = non_recursive_wrapper
+
+    def find_generated_makefile(self, output_name):
+
+        # This method returns the path to the existing makefile generated
+        # for the given output, either as the default makefile or as a
+        # .mk file included in a wrapper. None is returned if there is
+        # no such file.
+
+        makefilepath = os.path.join(self.working_dir_path, 'makefile')
+
+        if os.path.isfile(makefilepath):
+
+            f = open(makefilepath, 'r')
+            first_line = f.readline().strip()
+            f.close()
+
+            if first_line == '#@' + output_name:
+                return makefilepath
+
+        makefilepath = os.path.join(self.working_dir_path, '{}.mk'.format(output_name))
+
+        if os.path.isfile(makefilepath):
+            return makefilepath
+
+        return None
+
+    def update_makefile(self, makefile, output_name):
+
+        # This method overwrites the existing makefile generated for the
+        # given output if its content differs from the new makefile text,
+        # ignoring the time stamp. It returns False if there is no
+        # existing makefile for the output.
+
+        makefilepath = self.find_generated_makefile(output_name)
+
+        if makefilepath is None:
+            return False
+
+        f = open(makefilepath, 'r')
+        text = f.read()
+        f.close()
+
+        def strip_time_stamp(text):
+            return [line for line in text.split('\n')
+                    if not line.startswith('# This makefile was generated by makemake.py')]
+
+        if strip_time_stamp(text) == strip_time_stamp(makefile):
+
+            print('\nMakefile \"{}\" is up to date'
+                  .format(makefilepath.split(os.sep)[-1]))
+
+        else:
+
+            print('\nUpdating makefile \"{}\"... '
+                  .format(makefilepath.split(os.sep)[-1]), end='')
+
+            f = open(makefilepath, 'w')
+            f.write(makefile)
+            f.close()
+
+            print('Done')
+
+            # A non-recursive wrapper contains the content of the makefiles
+            if self.non_recursive_wrapper and makefilepath.endswith('.mk'):
+                self.generate_wrapper(replace_existing=True)
+
+        return True
+
+    def save_makefile(self, makefile, output_name, incremental=False):
+
+        # This method saves the generated makefile text to a file, while
+        # managing any existing makefiles to avoid conflicts. In incremental
+        # mode, an existing makefile for the same output is updated in place
+        # and only rewritten if its content has changed.
+
+        if incremental and self.update_makefile(makefile, output_name):
+            return
+
+        filename = 'makefile'
+        makefilepath = os.path.join(self.working_dir_path, filename)
+
+        if os.path.exists(makefilepath):
+
+            f = open(makefilepath, 'r')
+            lines = f.readlines()
+            f.close()
+
+            is_wrapper = False
+            other_output_name = None
+
+            for line in lines:
+
+                stripped = line.strip()
+
+                if stripped == '#$wrapper':
+
+                    is_wrapper = True
+                    break
+
+                elif len(stripped) > 2 and stripped[:2] == '#@':
+
+                    other_output_name = stripped[2:]
+                    break
+
+            if is_wrapper:
+
+                print('\nThere exists a makefile wrapper in this directory')
+
+                policy_answers = {'overwrite': 'o', 'wrap': 'w', 'fail': 'a'}
+
+                ans = get_answer('How to proceed? [o: overwrite wrapper, ' +
+                                 'n: set custom name, w: include in wrapper, a: abort]\n',
+                                 ['o', 'n', 'w', 'a'],
+                                 policy_answers.get(self.policy))
+
+                if ans == 'o':
+
+                    print('Overwriting makefile wrapper... ', end='')
+
+                    f = open(makefilepath, 'w')
+                    f.write(makefile)
+                    f.close()
+
+                    print('Done')
+
+                elif ans == 'n':
+
+                    filename = input('Input new makefile name:\n')
+                    self.write_new_file(makefile, filename)
+
+                elif ans == 'w':
+
+                    makefile_name = '{}.mk'.format(output_name)
+
+                    self.write_new_file(makefile, makefile_name)
+
+                    self.generate_wrapper()
+
+                elif ans == 'a':
+
+                    abort()
+
+            elif other_output_name is not None and \
+                 output_name != other_output_name:
+
+                print('\nThere already exists a default ' +
+                      'generated makefile for another output file')
+
+                policy_answers = {'overwrite': 'o', 'wrap': 'w', 'fail': 'a'}
+
+                ans = get_answer('How to proceed? [o: overwrite, ' +
+                                 'n: set custom name, w: create wrapper, a: abort]\n',
+                                 ['o', 'n', 'w', 'a'],
+                                 policy_answers.get(self.policy))
+
+                if ans == 'o':
+
+                    print('Overwriting old makefile... ', end='')
+
+                    f = open(makefilepath, 'w')
+                    f.write(makefile)
+                    f.close()
+
+                    print('Done')
+
+                elif ans == 'n':
+
+                    filename = input('Input new makefile name:\n')
+                    self.write_new_file(makefile, filename)
+
+                elif ans == 'w':
+
+                    makefile_name = '{}.mk'.format(output_name)
+                    other_makefile_name = '{}.mk'.format(other_output_name)
+
+                    print('Renaming old makefile to \"{}\"... '
+                          .format(other_makefile_name), end='')
+
+                    os.rename(makefilepath,
+                              os.path.join(self.working_dir_path, other_makefile_name))
+
+                    print('Done')
+
+                    self.write_new_file(makefile, makefile_name)
+
+                    self.generate_wrapper()
+
+                elif ans == 'a':
+
+                    abort()
+
+            else:
+
+                # A makefile for the same output is always replaced by
+                # the policies, while other makefiles are only replaced
+                # with the "overwrite" policy
+                if output_name == other_output_name:
+
+                    print('\nThere already exists a default ' +
+                          'generated makefile for this output file')
+
+                    policy_answers = {'overwrite': 'o', 'wrap': 'o', 'fail': 'o'}
+
+                else:
+
+                    print('\nThere already exists a default ' +
+                          'non-generated makefile in this directory')
+
+                    policy_answers = {'overwrite': 'o', 'wrap': 'a', 'fail': 'a'}
+
+                ans = get_answer('How to proceed? [o: overwrite, ' +
+                                 'n: set custom name, a: abort]\n',
+                                 ['o', 'n', 'a'],
+                                 policy_answers.get(self.policy))
+
+                if ans == 'o':
+
+                    print('Overwriting old makefile... ', end='')
+
+                    f = open(makefilepath, 'w')
+                    f.write(makefile)
+                    f.close()
+
+                    print('Done')
+
+                elif ans == 'n':
 
                     filename = input('Input new makefile name:\n')
                     self.write_new_file(makefile, filename)
 
-                elif ans == 'w':
+                elif ans == 'a':
+
+                    abort()
+
+        else:
+
+            print('\nSaving makefile... ', end='')
+
+            f = open(makefilepath, 'w')
+            f.write(makefile)
+            f.close()
+
+            print('Done')
+
+    def write_new_file(self, text, filename, ftype='makefile'):
+
+        # This method saves a new file with a custom name.
+
+        filepath = os.path.join(self.working_dir_path, filename)
+        cannot_write = True
+
+        while cannot_write:
+
+            print('\nSaving {} as \"{}\"... '.format(ftype, filename), end='')
+
+            if os.path.exists(filepath):
+
+                print('\nA file of the same name already exists')
+
+                policy_answers = {'overwrite': 'o', 'wrap': 'o', 'fail': 'a'}
+
+                ans = get_answer('How to proceed? [o: overwrite, ' +
+                                 'n: new name, a: abort]\n',
+                                 ['o', 'n', 'a'],
+                                 policy_answers.get(self.policy))
+
+                if ans == 'o':
+
+                    print('Overwriting old file... ', end='')
+
+                    cannot_write = False
+
+                elif ans == 'n':
+
+                    filename = input('Input new {} name:\n'.format(ftype))
+                    filepath = os.path.join(self.working_dir_path, filename)
+
+                elif ans == 'a':
+
+                    abort()
+
+            else:
+                cannot_write = False
+
+        f = open(filepath, 'w')
+        f.write(text)
+        f.close()
+
+        print('Done')
+
+    def generate_wrapper(self, replace_existing=False):
+
+        # This method generates a wrapper for the makefiles in the
+        # working directory. A non-recursive wrapper is used if possible,
+        # and otherwise the wrapper runs the makefiles separately. An
+        # existing wrapper is replaced without asking if specified.
+
+        print('\nGenerating makefile wrapper...')
+
+        makefile_names = []
+
+        for filename in os.listdir(self.working_dir_path):
+            if os.path.isfile(filename):
+                if '.' in filename and filename.split('.')[-1] == 'mk':
+
+                    makefile_names.append('.'.join(filename.split('.')[:-1]))
+
+        if len(makefile_names) > 0:
+
+            print('Makefiles found:\n' +
+                  '\n'.join(['-{}.mk'.format(makefile_name)
+                             for makefile_name in makefile_names]))
+
+            wrapper_text = None
+
+            if self.non_recursive_wrapper:
+                wrapper_text = self.create_non_recursive_wrapper(makefile_names)
+
+            if wrapper_text is None:
+
+                wrapper_text = '''#$wrapper
+    # This makefile wrapper was generated by makemake.py ({}).
+    # GitHub repository: https://github.com/lars-frogner/makemake.py
+    #
+    # Usage:
+    # 'make <name> [ARGS="<argument 1> <argument 2> ..."]'
+    #
+    # This runs <name>.mk with the stated arguments.''' \
+                .format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+
+                for makefile_name in makefile_names:
+
+                    wrapper_text += '\n\n{}:\n\tmake -f {} $(ARGS)'\
+                                    .format(makefile_name, makefile_name + '.mk')
+
+            if replace_existing:
+
+                print('Updating makefile wrapper... ', end='')
+
+                f = open(os.path.join(self.working_dir_path, 'makefile'), 'w')
+                f.write(wrapper_text)
+                f.close()
+
+                print('Done')
+
+            else:
+                self.write_new_file(wrapper_text,
+                                    'makefile',
+                                    ftype='makefile wrapper')
+
+        else:
+
+            print('No makefiles found')
+
+    def create_non_recursive_wrapper(self, makefile_names):
+
+        # This method returns the text of a wrapper containing the content
+        # of all the given makefiles, so that a single make process builds
+        # all the programs and can run all compilations in parallel. The
+        # variables of each makefile are prefixed with its name, and so are
+        # its actions, except for the ones setting the compiler flags and
+        # cleaning up, which become double-colon rules run for all the
+        # makefiles. Rules for files that several makefiles create are only
+        # included once. None is returned if two makefiles create the same
+        # file in different ways.
+
+        print('Merging makefiles... ', end='')
+
+        phony_targets = []
+        configuration_targets = {}
+        makefile_texts = []
+        file_rules = {}
+
+        for makefile_name in makefile_names:
+
+            f = open(os.path.join(self.working_dir_path, makefile_name + '.mk'), 'r')
+            items = split_makefile_items(f.read())
+            f.close()
+
+            prefix = re.sub(r'\W', '_', makefile_name).upper() + '_'
+
+            variables = {}
+            makefile_phony_targets = []
+
+            for comment_lines, lines, _ in items:
+
+                variable_match = makefile_variable_pattern.match(lines[0])
+
+                if variable_match is not None and variable_match.group(1) is None:
+                    variables[variable_match.group(2)] = variable_match.group(3)
+
+                elif lines[0].startswith('.PHONY:'):
+                    makefile_phony_targets += lines[0].split(':', 1)[1].split()
+
+            # The makefile is run again for profile-guided optimization, so
+            # it must refer to itself rather than to the wrapper, and the
+            # configuration is also selected by the prefixed actions
+            for variable in variables:
+                variables[variable] = variables[variable]\
+                    .replace('$(firstword $(MAKEFILE_LIST))', makefile_name + '.mk')\
+                    .replace('$(MAKECMDGOALS)',
+                             '$(foreach goal,$(MAKECMDGOALS),$(lastword $(subst -, ,$(goal))))')
+
+            variable_pattern = re.compile(r'\b(' + '|'.join(sorted([re.escape(variable)
+                                                                     for variable in variables],
+                                                                    key=len, reverse=True)) +
+                                          r')\b') if len(variables) > 0 else None
+
+            def rename_target(target):
+
+                # This function returns the name of the given target in
+                # the wrapper.
+
+                if target not in makefile_phony_targets or target == 'FORCE' or \
+                   is_shared_action(target):
+                    return target
+                elif target == 'all':
+                    return makefile_name
+                else:
+                    return makefile_name + '-' + target
+
+            makefile_text = '\n\n# Content of {}.mk'.format(makefile_name)
+
+            # Items that are left out pass on the start of their block
+            pending_block_start = True
+
+            for comment_lines, lines, starts_block in items:
+
+                pending_block_start = pending_block_start or starts_block
+
+                variable_match = makefile_variable_pattern.match(lines[0])
+
+                if variable_match is not None and variable_match.group(1) is None:
+
+                    lines = [lines[0][:variable_match.start(3)] + variables[variable_match.group(2)]]
+
+                elif lines[0].startswith('.PHONY:'):
+                    continue
+
+                elif variable_match is None and ':' in lines[0]:
+
+                    targets, prerequisites = lines[0].split(':', 1)
+                    targets = targets.split()
+
+                    if all([target in makefile_phony_targets and target != 'FORCE'
+                            for target in targets]):
+
+                        if any([is_shared_action(target) for target in targets]):
+                            separator = '::'
+                        else:
+                            separator = ':'
+
+                            for target in targets:
+                                if target in configuration_group_names:
+                                    configuration_targets.setdefault(target, []).append(rename_target(target))
+
+                        lines = ['{}{}{}'.format(' '.join([rename_target(target) for target in targets]),
+                                                 separator,
+                                                 ' '.join([''] + [rename_target(prerequisite)
+                                                                  for prerequisite in prerequisites.split()]))] + \
+                            lines[1:]
+
+                    else:
+
+                        # Rules for files are compared with all variables
+                        # expanded, so that the same file is only created
+                        # once, in the same way
+                        expanded_lines = [expand_makefile_variables(line, variables) for line in lines]
+                        file_targets = tuple(expanded_lines[0].split(':', 1)[0].split())
+
+                        if file_targets in file_rules:
+
+                            if file_rules[file_targets] != expanded_lines:
+
+                                print('Done')
+                                print('Makefiles create \"{}\" in different ways, using recursive wrapper'
+                                      .format(' '.join(file_targets)))
+
+                                return None
+
+                            continue
+
+                        file_rules[file_targets] = expanded_lines
+
+                if variable_pattern is not None:
+                    lines = [variable_pattern.sub(prefix + r'\1', line) for line in lines]
+
+                makefile_text += ('\n\n' if pending_block_start else '\n') + \
+                    '\n'.join(comment_lines + lines)
+
+                pending_block_start = False
+
+            phony_targets += [rename_target(target) for target in makefile_phony_targets]
+            makefile_texts.append(makefile_text)
+
+        print('Done')
+
+        phony_targets = remove_duplicates(['all'] + list(configuration_targets) +
+                                          [makefile_name for makefile_name in makefile_names] +
+                                          phony_targets)
+
+        wrapper_text = '''#$wrapper
+# This makefile wrapper was generated by makemake.py ({}).
+# GitHub repository: https://github.com/lars-frogner/makemake.py
+#
+# Usage:
+# make [<name> ...] [<argument> ...] [EXTRA_FLAGS="<flags>"]
+#
+# This builds the outputs of the given makefiles (all if no name is given)
+# in a single make process. The arguments debug, fast, lto and profile
+# select the compiler flags for all makefiles, and clean deletes the
+# auxiliary files of all makefiles. Other actions of <name>.mk are run
+# with <name>-<action>.
+
+# Make sure certain rules are not activated by the presence of files
+.PHONY: {}
+
+# Define default target group
+all: {}'''.format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                       ' '.join(phony_targets),
+                       ' '.join(makefile_names))
+
+        if len(configuration_targets) > 0:
+            wrapper_text += '\n\n# Define optional target groups for all makefiles' + \
+                            ''.join(['\n{}: {}'.format(target, ' '.join(configuration_targets[target]))
+                                     for target in configuration_targets])
+
+        wrapper_text += ''.join(makefile_texts) + \
+            '\n\n# Make sure the wrapper is generated again when the makefiles change' + \
+            '\nmakefile: {}'.format(' '.join([makefile_name + '.mk' for makefile_name in makefile_names])) + \
+            '\n\t$(error The makefiles have changed, run makemake.py -w --non-recursive again)'
+
+        return wrapper_text
+
+
+# Targets that select the flags used by generated makefiles
+configuration_group_names = ['debug', 'fast', 'lto', 'profile']
+
+# Pattern for the variable definitions of generated makefiles, with the
+# export keyword, the name and the value as groups
+makefile_variable_pattern = re.compile(r'^(export\s+)?([A-Za-z_]\w*)\s*[:+?]?=\s*(.*)$')
+
+makefile_reference_pattern = re.compile(r'\$\(([A-Za-z_]\w*)\)')
+
+
+def is_shared_action(target):
+
+    # This function checks whether the given action of a generated
+    # makefile is run for all makefiles included in a non-recursive
+    # wrapper.
+
+    return target == 'clean' or re.match(r'set_\w+_flags$', target) is not None
+
+
+def split_makefile_items(text):
+
+    # This function splits the text of a generated makefile into variable
+    # definitions, rules and other statements. Each item is returned with
+    # the comment lines directly preceding it, the recipe lines of a rule,
+    # and whether it starts a new block of lines. Comments that are not
+    # directly followed by a statement, like the introductory comments,
+    # are left out.
+
+    items = []
+    comment_lines = []
+    starts_block = True
+
+    for line in text.split('\n'):
+
+        if line.startswith('\t') and len(items) > 0 and len(comment_lines) == 0:
+            items[-1][1].append(line)
+
+        elif len(line.strip()) == 0:
+            comment_lines = []
+            starts_block = True
+
+        elif line.lstrip().startswith('#'):
+            comment_lines.append(line)
+
+        else:
+            items.append((comment_lines, [line], starts_block))
+            comment_lines = []
+            starts_block = False
+
+    return items
+
+
+def expand_makefile_variables(text, variables):
+
+    # This function replaces the references to the given makefile
+    # variables in the text with their values, until no references to
+    # them remain.
+
+    for _ in range(len(variables) + 1):
+
+        expanded_text = makefile_reference_pattern.sub(lambda match: variables.get(match.group(1),
+                                                                                     match.group(0)),
+                                                      text)
+
+        if expanded_text == text:
+            break
+
+        text = expanded_text
+
+    return text
+
+
+def get_answer(question, valid_answers, policy_answer=None):
+
+    # This function asks the given question until one of the valid
+    # answers is given, and returns the answer. If an answer given by a
+    # policy is supplied, it is printed and returned without asking.
+
+    if policy_answer is not None:
+
+        print(question + policy_answer)
+        return policy_answer
+
+    ans = ''
+    while ans not in valid_answers:
+        ans = input(question).lower()
+
+    return ans
+
+
+def abort():
+
+    print('Aborted')
+    sys.exit(1)
+
+
+def abort_missing_something(something, source_name, something_name):
+
+    print('Error: could not find {} \"{}\" used by source file \"{}\"'
+          .format(something, something_name, source_name))
+    sys.exit(1)
+
+
+def abort_multiple_something(something, something_name, name_list=False):
+
+    print('Error: found multiple {} named \"{}\"{}'
+          .format(something,
+                  something_name,
+                  '' if not name_list else '\n({})'.format(', '.join(name_list))))
+    sys.exit(1)
+
+
+def parse_file(instance_class, filename_with_path):
+
+    # This function is run by the worker processes used for parallel
+    # parsing. It returns the parse results for the given file, or None
+    # if parsing failed with an error message, in which case the file
+    # is parsed again by the main process to report the error.
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return instance_class(filename_with_path).parse_results
+
+    except SystemExit:
+        return None
+
+
+def copy_instance(instance):
+
+    # This function returns a copy of the given source or header instance,
+    # with its own copies of the lists, dictionaries and sets it holds, so
+    # that updating the copy leaves the original unchanged.
+
+    new_instance = copy.copy(instance)
+
+    for name, value in vars(instance).items():
+        if isinstance(value, (list, dict, set)):
+            setattr(new_instance, name, copy.copy(value))
+
+    return new_instance
+
+
+def get_file_stats(filename_with_path):
+
+    # This function returns the modification time and size of a file.
+
+    stats = os.stat(filename_with_path)
+
+    return stats.st_mtime_ns, stats.st_size
+
+
+def get_file_hash(filename_with_path):
+
+    # This function returns a hash of the content of a file.
+
+    f = open(filename_with_path, 'rb')
+    file_hash = hashlib.sha1(f.read()).hexdigest()
+    f.close()
+
+    return file_hash
+
+
+def find_reachable_sources(object_dependencies, root_sources):
+
+    # This function returns a set of the given root sources and all the
+    # sources they depend on, directly or indirectly, found with a
+    # breadth-first search through the dependency dictionary.
+
+    reachable_sources = set(root_sources)
+    queue = collections.deque(root_sources)
+
+    while len(queue) > 0:
+
+        for dependency in object_dependencies[queue.popleft()]:
+
+            if dependency not in reachable_sources:
+
+                reachable_sources.add(dependency)
+                queue.append(dependency)
+
+    return reachable_sources
+
+
+def remove_duplicates(duplist):
+
+    seen = set()
+    seen_add = seen.add
+
+    return [x for x in duplist if not (x in seen or seen_add(x))]
+
+
+def find_strongly_connected_components(nodes, node_list):
+
+    # This function uses an iterative version of Tarjan's algorithm to
+    # find the strongly connected components of the part of the graph
+    # containing the given nodes. The graph is a dictionary where the
+    # values are lists of the nodes each node depends on. The components
+    # are returned in the order they are completed, so every component
+    # comes after all the components it depends on.
+
+    in_graph = set(node_list)
+
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in node_list:
+
+        if root in index:
+            continue
+
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+
+        work_stack = [(root, iter(nodes[root]))]
+
+        while len(work_stack) > 0:
+
+            node, children = work_stack[-1]
+            descended = False
+
+            for child in children:
+
+                if child not in in_graph:
+                    continue
+
+                if child not in index:
+
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+
+                    work_stack.append((child, iter(nodes[child])))
+                    descended = True
+                    break
+
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+
+            if descended:
+                continue
 
-                    makefile_name = '{}.mk'.format(output_name)
-                    other_makefile_name = '{}.mk'.format(other_output_name)
+            work_stack.pop()
 
-                    print('Renaming old makefile to \"{}\"... '
-                          .format(other_makefile_name), end='')
+            if len(work_stack) > 0:
+                parent = work_stack[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
 
-                    os.rename(makefilepath,
-                              os.path.join(self.working_dir_path, other_makefile_name))
+            # If the node is the root of a component, collect its nodes
+            if lowlink[node] == index[node]:
 
-                    print('Done')
+                component = []
 
-                    self.write_new_file(makefile, makefile_name)
+                while True:
 
-                    self.generate_wrapper()
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
 
-                elif ans == 'a':
+                    if member is node:
+                        break
 
-                    abort()
+                components.append(component)
 
-            else:
+    return components
 
-                if output_name == other_output_name:
-                    print('\nThere already exists a default ' +
-                          'generated makefile for this output file')
-                else:
-                    print('\nThere already exists a default ' +
-                          'non-generated makefile in this directory')
 
-                ans = ''
-                while ans not in ['o', 'n', 'a']:
-                    ans = input('How to proceed? [o: overwrite, ' +
-                                'n: set custom name, a: abort]\n').lower()
+# Pattern for the C/C++ tokens that have to be recognized when removing
+# comments and strings. Quoted header names in include statements are
+# matched first so that they can be kept, and escaped characters in
+# string and character literals are consumed together with the backslash.
+# Apostrophes after a digit or a name other than a literal prefix are
+# digit separators, as in 1'000'000, and do not start character literals.
+c_token_pattern = re.compile(r'''
+    (?P<directive>\#[ \t]*(?:include|import)[ \t]*)"(?P<header>[^"\n]*)"
+  | //[^\n]*
+  | /\*.*?(?:\*/|\Z)
+  | "(?:\\.|[^"\\\n])*"?
+  | '(?:(?<!\w')|(?<=\b[uUL]')|(?<=\bu8'))(?:\\.|[^'\\\n])*'?
+''', re.VERBOSE | re.DOTALL)
 
-                if ans == 'o':
 
-                    print('Overwriting old makefile... ', end='')
+def replace_c_token(match):
 
-                    f = open(makefilepath, 'w')
-                    f.write(makefile)
-                    f.close()
+    # This function returns the replacement text for a token matched by
+    # c_token_pattern.
 
-                    print('Done')
+    if match.group('directive') is not None:
+        return '{}<{}>'.format(match.group('directive'), match.group('header'))
+    elif match.group(0)[:2] == '/*':
+        return ' '
+    else:
+        return ''
 
-                elif ans == 'n':
 
-                    filename = input('Input new makefile name:\n')
-                    self.write_new_file(makefile, filename)
+def remove_c_comments_and_strings(text):
 
-                elif ans == 'a':
+    # This function removes comments, string literals and character
+    # literals from the given C or C++ text in a single pass. Header
+    # names in quoted include statements are surrounded by angled
+    # brackets instead, so that they are not confused with strings.
 
-                    abort()
+    return c_token_pattern.sub(replace_c_token, text)
 
-        else:
 
-            print('\nSaving makefile... ', end='')
+# Pattern for the start of a header that is protected against repeated
+# inclusion, either with an include guard or with #pragma once
+include_guard_pattern = re.compile(r'\A\s*(?:#\s*pragma\s+once\b|#\s*ifndef\s+(\w+)\s*\n\s*#\s*define\s+\1\b)')
 
-            f = open(makefilepath, 'w')
-            f.write(makefile)
-            f.close()
 
-            print('Done')
+def has_include_guard(header):
 
-    def write_new_file(self, text, filename, ftype='makefile'):
+    # This function checks whether the given header is protected against
+    # being included more than once.
 
-        # This method saves a new file with a custom name.
+    f = open(header.filename_with_path, 'r')
+    text = remove_c_comments_and_strings(f.read())
+    f.close()
 
-        filepath = os.path.join(self.working_dir_path, filename)
-        cannot_write = True
+    return include_guard_pattern.match(text) is not None
 
-        while cannot_write:
 
-            print('\nSaving {} as \"{}\"... '.format(ftype, filename), end='')
+# Patterns for macro definitions and include statements
+c_define_pattern = re.compile(r'^[ \t]*#[ \t]*define[ \t]+([A-Za-z_]\w*)', re.MULTILINE)
+c_include_pattern = re.compile(r'^[ \t]*#[ \t]*include\b', re.MULTILINE)
 
-            if os.path.exists(filepath):
+c_brace_pattern = re.compile(r'[{}]')
 
-                print('\nA file of the same name already exists')
+# Pattern for the text before a block whose content lies at file scope
+c_transparent_block_pattern = re.compile(r'(?:\bnamespace(?:\s+[A-Za-z_]\w*)?|\bextern)\s*\Z')
 
-                ans = ''
-                while ans not in ['o', 'n', 'a']:
-                    ans = input('How to proceed? [o: overwrite, ' +
-                                'n: new name, a: abort]\n').lower()
+# Patterns for the names of types, static variables and static functions
+# defined at file scope
+c_tag_definition_pattern = re.compile(r'\b(?:struct|union|enum|class)\s+([A-Za-z_]\w*)\s*(?::[^;{}]*)?\{\}')
+c_typedef_pattern = re.compile(r'\btypedef\b[^;]*?([A-Za-z_]\w*)\s*(?:\[[^;]*\])?\s*;')
+c_static_pattern = re.compile(r'\bstatic\b[^(=\[,]*?([A-Za-z_]\w*)\s*(?:[(=\[,]|\Z)')
 
-                if ans == 'o':
 
-                    print('Overwriting old file... ', end='')
+def remove_c_blocks(text):
 
-                    cannot_write = False
+    # This function replaces the content of every block in the given C or
+    # C++ text with an empty block, leaving only the text at file scope.
+    # The content of namespaces and extern blocks is kept, since it also
+    # lies at file scope.
 
-                elif ans == 'n':
+    parts = []
+    block_stack = []
+    start = 0
 
-                    filename = input('Input new {} name:\n'.format(ftype))
-                    filepath = os.path.join(self.working_dir_path, filename)
+    for match in c_brace_pattern.finditer(text):
 
-                elif ans == 'a':
+        if match.group(0) == '{':
 
-                    abort()
+            is_transparent = False
 
-            else:
-                cannot_write = False
+            if all(block_stack):
 
-        f = open(filepath, 'w')
-        f.write(text)
-        f.close()
+                is_transparent = c_transparent_block_pattern.search(text, start,
+                                                                    match.start()) is not None
 
-        print('Done')
+                parts.append(text[start:match.start()] + ('' if is_transparent else '{}'))
+                start = match.end()
 
-    def generate_wrapper(self):
+            block_stack.append(is_transparent)
 
-        # This method generates a wrapper for the makefiles in the
-        # working directory.
+        elif len(block_stack) > 0:
 
-        print('\nGenerating makefile wrapper...')
+            is_transparent = block_stack.pop()
 
-        makefile_names = []
+            if all(block_stack):
 
-        for filename in os.listdir(self.working_dir_path):
-            if os.path.isfile(filename):
-                if '.' in filename and filename.split('.')[-1] == 'mk':
+                if is_transparent:
+                    parts.append(text[start:match.start()])
 
-                    makefile_names.append('.'.join(filename.split('.')[:-1]))
+                start = match.end()
 
-        if len(makefile_names) > 0:
+    if all(block_stack):
+        parts.append(text[start:])
 
-            print('Makefiles found:\n' +
-                  '\n'.join(['-{}.mk'.format(makefile_name)
-                             for makefile_name in makefile_names]))
+    return ''.join(parts)
 
-            wrapper_text = '''#$wrapper
-    # This makefile wrapper was generated by makemake.py ({}).
-    # GitHub repository: https://github.com/lars-frogner/makemake.py
-    #
-    # Usage:
-    # 'make <name> [ARGS="<argument 1> <argument 2> ..."]'
-    #
-    # This runs <name>.mk with the stated arguments.''' \
-            .format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
 
-            for makefile_name in makefile_names:
+def find_file_scope_names(text, clean_text):
 
-                wrapper_text += '\n\n{}:\n\tmake -f {} $(ARGS)'\
-                                .format(makefile_name, makefile_name + '.mk')
+    # This function returns the names that a C or C++ source defines for
+    # the rest of its translation unit: macros, types, and static variables
+    # and functions at file scope. The text should be without comments and
+    # strings, and the clean text also without preprocessor directives.
+    # It also returns whether any macro is defined before an include
+    # statement, in which case the macro can affect the included headers.
 
-            self.write_new_file(wrapper_text,
-                                'makefile',
-                                ftype='makefile wrapper')
+    define_matches = list(c_define_pattern.finditer(text))
+    include_matches = list(c_include_pattern.finditer(text))
 
-        else:
+    configures_headers = len(define_matches) > 0 and len(include_matches) > 0 and \
+        define_matches[0].start() < include_matches[-1].start()
 
-            print('No makefiles found')
+    names = set(match.group(1) for match in define_matches)
 
+    file_scope_text = remove_c_blocks(clean_text)
 
-def abort():
+    names.update(c_tag_definition_pattern.findall(file_scope_text))
+    names.update(c_typedef_pattern.findall(file_scope_text))
 
-    print('Aborted')
-    sys.exit(1)
+    for statement in re.split(r';|\{\}', file_scope_text):
+        names.update(c_static_pattern.findall(statement))
 
+    return sorted(names), configures_headers
 
-def abort_missing_something(something, source_name, something_name):
 
-    print('Error: could not find {} \"{}\" used by source file \"{}\"'
-          .format(something, something_name, source_name))
-    sys.exit(1)
+# Pattern for names followed by an opening parenthesis, which are either
+# function calls or function definitions. Names may be qualified with
+# namespace or class names.
+c_function_pattern = re.compile(r'(?<![\w:])([A-Za-z_]\w*(?:\s*::\s*[A-Za-z_]\w*)*)\s*\(')
 
+c_parenthesis_pattern = re.compile(r'[()]')
 
-def abort_multiple_something(something, something_name, name_list=False):
+non_whitespace_pattern = re.compile(r'\S')
 
-    print('Error: found multiple {} named \"{}\"{}'
-          .format(something,
-                  something_name,
-                  '' if not name_list else '\n({})'.format(', '.join(name_list))))
-    sys.exit(1)
 
+def find_function_usage(text, definition_characters):
 
-def remove_duplicates(duplist):
+    # This function finds all names followed by an argument list in the
+    # given C or C++ text (without comments, strings and preprocessor
+    # directives) in a single pass, and returns a dictionary with the usage
+    # of each name. Names that are followed by one of the given definition
+    # characters after the argument list are implemented ("producer"),
+    # other names are called ("consumer"). Names that are both implemented
+    # and called are left out. For qualified names, the usage is also
+    # recorded for each shorter qualification.
 
-    seen = set()
-    seen_add = seen.add
+    # Find the matching closing parenthesis for each opening parenthesis
+    closing_positions = {}
+    opening_positions = []
 
-    return [x for x in duplist if not (x in seen or seen_add(x))]
+    for match in c_parenthesis_pattern.finditer(text):
 
+        if match.group() == '(':
+            opening_positions.append(match.start())
 
-def read_flag_groups(compiler):
+        elif len(opening_positions) > 0:
+            closing_positions[opening_positions.pop()] = match.start()
 
-    # This functions reads the debug_flags.ini and performance_flags.ini
-    # files and extracts the relevant debug and performance flag groups.
+    implemented = set()
+    called = set()
 
-    source_path = os.path.dirname(os.path.abspath(__file__))
+    for match in c_function_pattern.finditer(text):
 
-    try:
-        f = open(os.path.join(source_path, 'debug_flags.ini'), 'r')
-        lines = f.readlines()
-        f.close()
+        closing_position = closing_positions.get(match.end() - 1)
 
-        debug_flags = ''
+        if closing_position is None:
+            continue
 
-        for line in lines:
+        character_after = non_whitespace_pattern.search(text, closing_position + 1)
+        is_implemented = character_after is not None and \
+            character_after.group() in definition_characters
 
-            colon_splitted = line.split(':')
+        name_parts = [part.strip() for part in match.group(1).split('::')]
 
-            if len(colon_splitted) > 1 and colon_splitted[0].strip() == compiler:
+        for i in range(len(name_parts)):
+            (implemented if is_implemented else called).add('::'.join(name_parts[i:]))
 
-                debug_flags = ':'.join(colon_splitted[1:]).strip()
-                break
+    usage = {}
 
-        if debug_flags == '':
-            print('\nWarning: no entry for compiler \"{}\" in \"debug_flags.ini\"'
-                  .format(compiler))
-            print('No debug flag group set')
+    for name in implemented - called:
+        usage[name] = 'producer'
+
+    for name in called - implemented:
+        usage[name] = 'consumer'
+
+    return usage
 
-    except IOError:
 
-        print('\nWarning: could not open \"debug_flags.ini\"')
-        print('No debug flag group set')
-        debug_flags = ''
+def read_flag_group(compiler, filename, description):
+
+    # This function reads the given flag group file, which lies in the
+    # same folder as this program, and extracts the flag group for the
+    # given compiler.
+
+    source_path = os.path.dirname(os.path.abspath(__file__))
 
     try:
-        f = open(os.path.join(source_path, 'performance_flags.ini'), 'r')
+        f = open(os.path.join(source_path, filename), 'r')
         lines = f.readlines()
         f.close()
 
-        fast_flags = ''
+        flags = ''
 
         for line in lines:
 
@@ -1078,38 +2990,381 @@ def read_flag_groups(compiler):
 
             if len(colon_splitted) > 1 and colon_splitted[0].strip() == compiler:
 
-                fast_flags = ':'.join(colon_splitted[1:]).strip()
+                flags = ':'.join(colon_splitted[1:]).strip()
                 break
 
-        if fast_flags == '':
-            print('\nWarning: no entry for compiler \"{}\" in \"performance_flags.ini\"'
-                  .format(compiler))
-            print('No debug flag group set')
+        if flags == '':
+            print('\nWarning: no entry for compiler \"{}\" in \"{}\"'
+                  .format(compiler, filename))
+            print('No {} flag group set'.format(description))
 
     except IOError:
 
-        print('\nWarning: could not open \"performance_flags.ini\"')
-        print('No debug flag group set')
-        fast_flags = ''
+        print('\nWarning: could not open \"{}\"'.format(filename))
+        print('No {} flag group set'.format(description))
+        flags = ''
+
+    return flags
+
+
+def read_flag_groups(compiler):
+
+    # This functions reads the debug_flags.ini and performance_flags.ini
+    # files and extracts the relevant debug and performance flag groups.
+
+    debug_flags = read_flag_group(compiler, 'debug_flags.ini', 'debug')
+    fast_flags = read_flag_group(compiler, 'performance_flags.ini', 'performance')
 
     return debug_flags, fast_flags
 
 
-def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compiler):
+def read_pgo_flag_groups(compiler):
 
-    # Collect makefile parameters
+    # This functions reads the pgo_instrument_flags.ini and pgo_use_flags.ini
+    # files and extracts the flag groups for compiling with instrumentation
+    # and for using the collected profile data.
+
+    pgo_instrument_flags = read_flag_group(compiler, 'pgo_instrument_flags.ini',
+                                           'PGO instrumentation')
+    pgo_use_flags = read_flag_group(compiler, 'pgo_use_flags.ini', 'PGO use')
+
+    return pgo_instrument_flags, pgo_use_flags
 
-    internal_libraries = sources.get_internal_libraries()
-    compile_rule_string = sources.get_compile_rules()
+
+def read_lto_flag_group(compiler):
+
+    # This functions reads the lto_flags.ini file and extracts the flag
+    # group for link-time optimization, which is used both when compiling
+    # and linking.
+
+    return read_flag_group(compiler, 'lto_flags.ini', 'LTO')
+
+
+def get_object_path(filename, use_build_directory):
+
+    # This function returns the path used in the makefile for an object,
+    # module or output file. If a build directory is used, the file lies
+    # in the directory for the current configuration.
+
+    if use_build_directory:
+        return object_directory + object_path_separator + filename
+    else:
+        return filename
+
+
+def get_precompiled_header_path(header, use_build_directory):
+
+    # This function returns the path used in the makefile for the wrapper
+    # including the given header, which the precompiled header is made
+    # from. Sources that force the inclusion of the wrapper use the
+    # precompiled header if it is valid, and the wrapper otherwise.
+
+    return get_object_path('pch', use_build_directory) + object_path_separator + header.filename
+
+
+def get_precompiled_header_rules(manager, sources, signature_path):
+
+    # This function returns the rules for creating the wrappers of the
+    # precompiled headers, and for precompiling them with the same flags
+    # as the sources.
+
+    precompiled_headers = remove_duplicates(list(sources.precompiled_headers.values()))
+
+    if len(precompiled_headers) == 0:
+        return ''
+
+    header_directory = get_object_path('pch', manager.build_directory)
+
+    if sys.platform == 'win32':
+        create_cmd = 'if not exist $@ mkdir $@'
+    else:
+        create_cmd = 'mkdir -p $@'
+
+    rules = ''
+
+    for header in precompiled_headers:
+
+        wrapper_path = get_precompiled_header_path(header, manager.build_directory)
+
+        # The precompiled header depends on the same headers as a source
+        # including the header
+        dependencies = [wrapper_path, header.filename_with_path.replace(' ', '\ ')] + \
+            [other_header.filename_with_path.replace(' ', '\ ')
+             for position, other_header in enumerate(sources.header_instances)
+             if (sources.reachable_headers[header] >> position) & 1 and other_header is not header] + \
+            ([signature_path] if signature_path is not None else [])
+
+        rules += '\n\n# Rule for creating the wrapper of {}'.format(header.filename) + \
+                 '\n{}: | {}'.format(wrapper_path, header_directory) + \
+                 '\n\t$(file >$@,#include \"{}\")'.format(header.filename_with_path) + \
+                 '\n\n# Rule for precompiling {}'.format(header.filename) + \
+                 '\n{}.gch: {}'.format(wrapper_path, ' '.join(dependencies)) + \
+                 '\n\t$(COMPILER) -c $(EXTRA_FLAGS) $(COMPILATION_FLAGS) $(HEADER_PATH_FLAGS) ' + \
+                 '-x {} {} -o {}.gch'.format(sources.source_instances[0].precompiled_header_language,
+                                             wrapper_path,
+                                             wrapper_path)
+
+    rules += '\n\n# Rule for creating the directory for precompiled headers' + \
+             '\n{}:\n\t{}'.format(header_directory, create_cmd)
+
+    return rules
+
+
+def get_unity_rules(manager, sources):
+
+    # This function returns the rules for creating the generated sources of
+    # the unity batches, which include the sources by their absolute paths
+    # since they lie in another directory. The generated sources are only
+    # rewritten when the list of included sources has changed, so that
+    # the batches are not recompiled needlessly.
+
+    unity_sources = [source for source in sources.reduced_source_instances
+                     if isinstance(source, unity_batch)]
+
+    if len(unity_sources) == 0:
+        return ''
+
+    unity_directory = get_object_path('unity', manager.build_directory)
+
+    if sys.platform == 'win32':
+        create_cmd = 'if not exist $@ mkdir $@'
+    else:
+        create_cmd = 'mkdir -p $@'
+
+    rules = ''
+
+    for unity_source in unity_sources:
+
+        rules += '\n\n# Rule for updating {} when the sources in it have changed' \
+                 .format(unity_source.filename) + \
+                 '\n{}: FORCE | {}'.format(unity_source.filename_with_path, unity_directory) + \
+                 '\n\t' + ''.join(['$(file {}$@.new,#include \"{}\")'
+                                    .format('>' if i == 0 else '>>',
+                                            os.path.abspath(source.filename_with_path))
+                                    for i, source in enumerate(unity_source.sources)]) + \
+                 '\n\t@{}'.format(get_update_command())
+
+    rules += '\n\n# Rule for creating the directory for unity sources' + \
+             '\n{}:\n\t{}'.format(unity_directory, create_cmd)
+
+    return rules
+
+
+def get_update_command():
+
+    # This function returns the command replacing a file with the new
+    # version written next to it, but only if the content differs, so that
+    # the modification time is kept when nothing has changed.
+
+    if sys.platform == 'win32':
+        return 'fc /b $@.new $@ >nul 2>nul && del /F $@.new || move /y $@.new $@ >nul'
+    else:
+        return 'cmp -s $@.new $@ && rm -f $@.new || mv -f $@.new $@'
+
+
+def get_build_directory_variables(manager):
+
+    # This function returns the definitions of the variables selecting the
+    # directory for object files, or an empty string if no build directory
+    # is used. Each flag group gets its own directory, chosen from the
+    # targets given to make, so that objects compiled with different flags
+    # are never mixed.
+
+    if not manager.build_directory:
+        return ''
+
+    return '\n\n# Use a separate directory for the files of each configuration' + \
+           '\nBUILD_DIR = build' + \
+           '\nCONFIGURATION = $(or $(firstword $(filter debug fast lto profile,$(MAKECMDGOALS))),default)' + \
+           '\nOBJECT_DIR = $(BUILD_DIR){}$(CONFIGURATION)'.format(object_path_separator)
+
+
+def get_launcher_variables(manager):
+
+    # This function returns the definition of the program that the
+    # compiler is run through, and of the cache directory it should use.
+    # An empty string is returned if no launcher is used.
+
+    if not manager.launcher:
+        return ''
+
+    text = '\n\n# Run the compiler through a launcher' + \
+           '\nLAUNCHER = {}'.format(manager.launcher)
+
+    if manager.launcher_cache is not None:
+        text += '\nexport {} = {}'.format(compiler_caches[os.path.basename(manager.launcher)][0],
+                                         manager.launcher_cache)
+
+    return text
+
+
+def get_optional_variables(manager):
+
+    # This function returns the definitions of the variables that are only
+    # present in the makefile when the corresponding options are used.
+
+    return get_build_directory_variables(manager) + get_launcher_variables(manager)
+
+
+def get_pgo_rules():
+
+    # This function returns the rules for profile-guided optimization. The
+    # makefile is run again in a separate folder, with the performance
+    # flags and the flags for instrumentation or for using the profile
+    # data. All objects are recompiled in both stages, since the profile
+    # data must match the instrumented objects it was collected with.
+
+    if sys.platform == 'win32':
+        create_cmd = 'if not exist $(PGO_DIR) mkdir $(PGO_DIR)'
+        delete_cmd = 'del /F $(addprefix $(PGO_DIR)\\,$(OBJECT_FILES:.o=.gcda)) 2>nul'
+    else:
+        create_cmd = 'mkdir -p $(PGO_DIR)'
+        delete_cmd = 'rm -f $(addprefix $(PGO_DIR)/,$(OBJECT_FILES:.o=.gcda))'
+
+    make_cmd = '$(MAKE) -B -C $(PGO_DIR) -f $(MAKEFILE_PATH) EXTRA_FLAGS=\"$(EXTRA_FLAGS) $(PERFORMANCE_FLAGS) {}\"'
+
+    return '\n\n# Action for compiling with instrumentation for profile-guided optimization' + \
+           '\npgo-instrument:\n\t{}\n\t{}\n\t{}'.format(create_cmd,
+                                                      delete_cmd,
+                                                      make_cmd.format('$(PGO_INSTRUMENT_FLAGS)')) + \
+           '\n\n# Action for running the instrumented executable to collect profile data' + \
+           '\npgo-train:\n\t$(PGO_DIR){}$(EXECUTABLE) $(TRAIN_ARGS)'.format(object_path_separator) + \
+           '\n\n# Action for compiling with optimizations guided by the collected profile data' + \
+           '\npgo:\n\t{}'.format(make_cmd.format('$(PGO_USE_FLAGS)'))
+
+
+def get_program_link_rules(sources, use_build_directory=False):
+
+    # This function returns the definitions of the variables holding the
+    # object files of each program in a combined makefile, and the rules
+    # for linking the programs. If a build directory is used, each program
+    # can still be built by giving its name to make.
+
+    variable_definitions = ''
+    link_rules = ''
+
+    for executable_name, object_names in sources.program_object_files:
+
+        variable = re.sub(r'\W', '_', executable_name.split('.')[0]).upper() + '_OBJECT_FILES'
+        executable_path = get_object_path(executable_name, use_build_directory)
+
+        variable_definitions += '\n{} = {}'.format(variable, ' '.join([get_object_path(object_name,
+                                                                                      use_build_directory)
+                                                                      for object_name in object_names]))
+
+        if use_build_directory:
+            link_rules += '\n\n# Rule for building {0} for the current configuration' \
+                          '\n.PHONY: {0}\n{0}: {1}'.format(executable_name, executable_path)
+
+        link_rules += '\n\n# Rule for linking {0}\n{1}: $({2})'.format(executable_name,
+                                                                       executable_path,
+                                                                       variable) + \
+            '\n\t$(COMPILER) $(EXTRA_FLAGS) $(LINKING_FLAGS) $({}) '.format(variable) + \
+            '$(LIBRARY_PATH_FLAGS) $(LIBRARY_LINKING_FLAGS) -o {}'.format(executable_path)
+
+    return variable_definitions, link_rules
+
+
+def get_pure_output_name(manager, sources):
+
+    # This function returns the name of the output of the given source
+    # container without extension, which identifies its makefile.
 
     if manager.executable:
         output_name = manager.executable
     elif manager.library:
         output_name = manager.library
+    elif sources.program_sources is not None:
+        return combined_output_name
     else:
         output_name = sources.program_source.executable_name
 
-    pure_output_name = output_name.split('.')[0]
+    return output_name.split('.')[0]
+
+
+def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compiler):
+
+    # Collect makefile parameters
+
+    internal_libraries = sources.get_internal_libraries()
+    if manager.flag_signatures:
+        signature_path = get_object_path(flag_signature_name, manager.build_directory)
+    else:
+        signature_path = None
+
+    compile_rule_string = sources.get_compile_rules(include_headers=not manager.use_depfiles,
+                                                    use_build_directory=manager.build_directory,
+                                                    signature_path=signature_path)
+
+    if manager.precompiled_headers:
+        compile_rule_string += get_precompiled_header_rules(manager, sources, signature_path)
+
+    if manager.unity_budget is not None:
+        compile_rule_string += get_unity_rules(manager, sources)
+
+    # Compilation is done through the launcher, while linking still uses
+    # the compiler directly
+    if manager.launcher:
+        compile_rule_string = compile_rule_string.replace('\t$(COMPILER) -c ',
+                                                          '\t$(LAUNCHER) $(COMPILER) -c ')
+
+    compiler_cache = os.path.basename(manager.launcher) if manager.launcher else None
+
+    if compiler_cache in compiler_caches:
+        compile_rule_string += '\n\n# Action for displaying the statistics of the compiler cache' + \
+                               '\n.PHONY: cache-stats\ncache-stats:' + \
+                               '\n\t$(LAUNCHER) {}'.format(compiler_caches[compiler_cache][1])
+
+    # The signature file holds the compilation command, and is only
+    # rewritten when the command differs from the one the objects were
+    # last compiled with
+    if manager.flag_signatures:
+
+        compile_rule_string += '\n\n# Rule for updating {} when the compilation command has changed' \
+                               .format(signature_path) + \
+                               '\n{}: FORCE{}'.format(signature_path,
+                                                      ' | ' + object_directory
+                                                      if manager.build_directory else '') + \
+                               '\n\t$(file >$@.new,$(COMPILER) $(EXTRA_FLAGS) ' + \
+                               '$(COMPILATION_FLAGS) $(HEADER_PATH_FLAGS))' + \
+                               '\n\t@{}'.format(get_update_command())
+
+    if manager.flag_signatures or manager.unity_budget is not None:
+        compile_rule_string += '\n\n# Target that is always out of date' + \
+                               '\n.PHONY: FORCE\nFORCE:'
+
+    if manager.build_directory:
+
+        if sys.platform == 'win32':
+            create_cmd = 'if not exist $@ mkdir $@'
+        else:
+            create_cmd = 'mkdir -p $@'
+
+        compile_rule_string += '\n\n# Rule for creating the directory for object files' + \
+                               '\n{}:\n\t{}'.format(object_directory, create_cmd)
+
+    # Let the compiler write the header dependencies of each object to a
+    # .d file, and include these files in the makefile
+    if manager.use_depfiles:
+        compile_rule_string += '\n\n# Include the header dependencies written by the compiler' + \
+                               '\n-include $(OBJECT_FILES:.o=.d)'
+
+    if manager.executable:
+        output_names = [manager.executable]
+    elif manager.library:
+        output_names = [manager.library]
+    elif sources.program_sources is not None:
+        output_names = [executable_name for executable_name, _
+                        in sources.program_object_files]
+    else:
+        output_names = [sources.program_source.executable_name]
+
+    pure_output_name = get_pure_output_name(manager, sources)
+
+    # The outputs are placed together with the object files they are
+    # linked from
+    output_name = ' '.join([get_object_path(name, manager.build_directory)
+                            for name in output_names])
 
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
@@ -1120,10 +3375,26 @@ def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compi
 
     debug_flags, fast_flags = read_flag_groups(compiler)
 
+    if manager.library:
+        pgo_instrument_flags, pgo_use_flags = '', ''
+    else:
+        pgo_instrument_flags, pgo_use_flags = read_pgo_flag_groups(compiler)
+
+    lto_flags = read_lto_flag_group(compiler)
+    lto_archiver = lto_archivers.get(compiler, 'ar')
+
+    # Objects compiled for link-time optimization can only be archived by
+    # an archiver that understands them
+    if lto_flags != '' and compiler not in lto_archivers and \
+       manager.library and not manager.library_is_shared:
+        print('\nWarning: no archiver for link-time optimization known for compiler \"{}\"'
+              .format(compiler))
+        print('The static library created with \"make lto\" may not be usable')
+
     if internal_libraries.pop('mpi'):
         compiler = mpi_compiler
 
-    object_files = ' '.join([source.object_name
+    object_files = ' '.join([get_object_path(source.object_name, manager.build_directory)
                              for source in sources.reduced_source_instances])
 
     if internal_libraries.pop('openmp'):
@@ -1137,6 +3408,9 @@ def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compi
         compilation_flags += '-fpic'
         linking_flags += '-shared'
 
+    if manager.use_depfiles:
+        compilation_flags = ' '.join(compilation_flags.split() + ['-MMD', '-MP'])
+
     header_path_flags = ' '.join(['-I\"{}\"'.format(path)
                                   for path in manager.all_header_paths])
 
@@ -1169,8 +3443,15 @@ def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compi
                     ' & echo ^<none^>:  Compiles with no compiler flags.' + \
                     ' & echo debug:   Compiles with flags useful for debugging.' + \
                     ' & echo fast:    Compiles with flags for high performance.' + \
-                    ' & echo profile: Compiles with flags for profiling.' if not manager.library else '' + \
-                    ' & echo gprof:   Displays the profiling results with gprof.' if not manager.library else '' + \
+                    ' & echo lto:     Compiles with flags for high performance and link-time optimization.' + \
+                    (' & echo profile: Compiles with flags for profiling.' if not manager.library else '') + \
+                    (' & echo gprof:   Displays the profiling results with gprof.' if not manager.library else '') + \
+                    (' & echo pgo-instrument: Compiles with instrumentation for profile-guided optimization.' +
+                     ' & echo pgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.' +
+                     ' & echo pgo:     Compiles with optimizations guided by the training runs.'
+                     if not manager.library else '') + \
+                    (' & echo cache-stats: Displays the hit rates of the compiler cache.'
+                     if compiler_cache in compiler_caches else '') + \
                     ' & echo clean:   Deletes auxiliary files.' + \
                     ' & echo help:    Displays this help text.' + \
                     ' & echo.' + \
@@ -1188,17 +3469,63 @@ def get_common_makefile_parameters(manager, sources, default_compiler, mpi_compi
                     '\\n<none>:  Compiles with no compiler flags.' + \
                     '\\ndebug:   Compiles with flags useful for debugging.' + \
                     '\\nfast:    Compiles with flags for high performance.' + \
-                    '\\nprofile: Compiles with flags for profiling.' if not manager.library else '' + \
-                    '\\ngprof:   Displays the profiling results with gprof.' if not manager.library else '' + \
+                    '\\nlto:     Compiles with flags for high performance and link-time optimization.' + \
+                    ('\\nprofile: Compiles with flags for profiling.' if not manager.library else '') + \
+                    ('\\ngprof:   Displays the profiling results with gprof.' if not manager.library else '') + \
+                    ('\\npgo-instrument: Compiles with instrumentation for profile-guided optimization.' +
+                     '\\npgo-train: Runs the instrumented executable with the arguments in TRAIN_ARGS.' +
+                     '\\npgo:     Compiles with optimizations guided by the training runs.'
+                     if not manager.library else '') + \
+                    ('\\ncache-stats: Displays the hit rates of the compiler cache.'
+                     if compiler_cache in compiler_caches else '') + \
                     '\\nclean:   Deletes auxiliary files.' + \
                     '\\nhelp:    Displays this help text.' + \
                     '\\n' + \
                     '\\nTo compile with additional flags, add the argument' + \
                     '\\nEXTRA_FLAGS=\\"<flags>\\""'
 
+    # The dependency files written by the compiler are deleted together
+    # with the object files
+    if manager.use_depfiles:
+        delete_trail = ' $(OBJECT_FILES:.o=.d)' + delete_trail
+
+    if manager.flag_signatures:
+        delete_trail = ' ' + signature_path + delete_trail
+
+    # The directories of all configurations are deleted as well
+    if manager.build_directory:
+        if sys.platform == 'win32':
+            delete_cmd = 'if exist $(BUILD_DIR) rmdir /s /q $(BUILD_DIR) & ' + delete_cmd
+        else:
+            delete_cmd = 'rm -rf $(BUILD_DIR) && ' + delete_cmd
+
+    # The folder of precompiled headers is deleted as well, unless it
+    # lies in the build directory
+    if manager.precompiled_headers and not manager.build_directory:
+        if sys.platform == 'win32':
+            delete_cmd = 'if exist pch rmdir /s /q pch & ' + delete_cmd
+        else:
+            delete_cmd = 'rm -rf pch && ' + delete_cmd
+
+    # The folder of unity sources is deleted as well, unless it lies in
+    # the build directory
+    if manager.unity_budget is not None and not manager.build_directory:
+        if sys.platform == 'win32':
+            delete_cmd = 'if exist unity rmdir /s /q unity & ' + delete_cmd
+        else:
+            delete_cmd = 'rm -rf unity && ' + delete_cmd
+
+    # The folder used for profile-guided optimization is deleted as well
+    if not manager.library:
+        if sys.platform == 'win32':
+            delete_cmd = 'if exist $(PGO_DIR) rmdir /s /q $(PGO_DIR) & ' + delete_cmd
+        else:
+            delete_cmd = 'rm -rf $(PGO_DIR) && ' + delete_cmd
+
     return pure_output_name, current_time, compiler, \
         output_name, object_files, compilation_flags, \
         linking_flags, header_path_flags, library_link_flags, \
         library_path_flags, debug_flags, fast_flags, \
+        pgo_instrument_flags, pgo_use_flags, lto_flags, lto_archiver, \
         compile_rule_string, delete_cmd, delete_trail, \
         help_text
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+#
+# This program generates a chain of Fortran modules, where each module
+# uses the modules preceding it, creates a makefile for it with
+# makemake.py and builds it with parallel make. It checks that every
+# source is compiled exactly once, that all object and module files are
+# created, and that running make again does nothing. It can also be run
+# with pytest.
+#
+# Usage:
+# test_fortran_module_chain.py [<number of modules> [<number of jobs>]]
+#
+import sys
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+makemake_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'makemake.py')
+
+# Number of preceding modules that each module uses
+uses_per_module = 3
+
+
+def write_module_chain(directory, n_modules):
+
+    # This function writes the sources of the module chain and of a
+    # program using the last module, and returns their filenames.
+
+    filenames = []
+
+    for i in range(n_modules):
+
+        used_modules = ['m{}'.format(j) for j in range(max(0, i - uses_per_module), i)]
+
+        lines = ['module m{}'.format(i)] + \
+                ['  use {}'.format(module) for module in used_modules] + \
+                ['  implicit none',
+                 'contains',
+                 '  integer function f{}(x)'.format(i),
+                 '    integer, intent(in) :: x',
+                 '    f{} = x + 1'.format(i) if len(used_modules) == 0 else
+                 '    f{} = f{}(x) + 1'.format(i, i - 1),
+                 '  end function f{}'.format(i),
+                 'end module m{}'.format(i)]
+
+        filenames.append('m{}.f90'.format(i))
+        write_file(os.path.join(directory, filenames[-1]), lines)
+
+    lines = ['program main',
+             '  use m{}'.format(n_modules - 1),
+             '  implicit none',
+             '  print *, f{}(0)'.format(n_modules - 1),
+             'end program main']
+
+    filenames.append('main.f90')
+    write_file(os.path.join(directory, filenames[-1]), lines)
+
+    return filenames
+
+
+def write_file(filename_with_path, lines):
+
+    # This function writes the given lines to a file.
+
+    f = open(filename_with_path, 'w')
+    f.write('\n'.join(lines) + '\n')
+    f.close()
+
+
+def run(command, directory):
+
+    # This function runs the given command in the given directory and
+    # returns its output, failing if the command fails.
+
+    result = subprocess.run(command, cwd=directory, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, universal_newlines=True)
+
+    if result.returncode != 0:
+        raise AssertionError('\"{}\" failed:\n{}'.format(' '.join(command), result.stdout))
+
+    return result.stdout
+
+
+def check_module_chain(n_modules, n_jobs):
+
+    # This function builds the module chain with the given number of
+    # make jobs in a temporary directory, and raises an AssertionError if
+    # any of the checks fail.
+
+    directory = tempfile.mkdtemp(prefix='makemake_module_chain_')
+
+    try:
+
+        filenames = write_module_chain(directory, n_modules)
+
+        run([sys.executable, makemake_path] + filenames + ['--batch'], directory)
+
+        output = run(['make', '-j{}'.format(n_jobs)], directory)
+
+        compile_counts = {filename: 0 for filename in filenames}
+
+        for line in output.split('\n'):
+            if re.search(r'\s-c\s', line):
+                for filename in re.findall(r'\b(m\d+\.f90|main\.f90)\b', line):
+                    compile_counts[filename] += 1
+
+        wrong_counts = ['{} ({} times)'.format(filename, count)
+                        for filename, count in compile_counts.items() if count != 1]
+
+        if len(wrong_counts) > 0:
+            raise AssertionError('Sources not compiled exactly once: ' + ', '.join(wrong_counts))
+
+        missing_files = [name for i in range(n_modules)
+                         for name in ['m{}.o'.format(i), 'm{}.mod'.format(i)]
+                         if not os.path.isfile(os.path.join(directory, name))] + \
+                        [name for name in ['main.o', 'main.x']
+                         if not os.path.isfile(os.path.join(directory, name))]
+
+        if len(missing_files) > 0:
+            raise AssertionError('Files not created: ' + ', '.join(missing_files))
+
+        result = run(['./main.x'], directory)
+
+        if result.split() != [str(n_modules)]:
+            raise AssertionError('Unexpected program output: ' + result)
+
+        output = run(['make', '-j{}'.format(n_jobs)], directory)
+
+        if 'Nothing to be done' not in output or re.search(r'\s-c\s', output):
+            raise AssertionError('Second make was not a no-op:\n' + output)
+
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_module_chain():
+
+    import pytest
+
+    if shutil.which('gfortran') is None or shutil.which('make') is None:
+        pytest.skip('gfortran and make are required')
+
+    check_module_chain(60, 16)
+
+
+if __name__ == '__main__':
+
+    n_modules = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    n_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    check_module_chain(n_modules, n_jobs)
+
+    print('Built a chain of {} modules with make -j{}: every source was compiled once, '
+          'and the second make did nothing'.format(n_modules, n_jobs))
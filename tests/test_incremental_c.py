@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# This program creates a small C project, edits it a few times and runs
+# makemake.py with --incremental after each edit. It checks that the
+# makefile is the same as the one generated from scratch, and that the
+# dependencies of the unaffected files are reused. It can also be run
+# with pytest.
+#
+import sys
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+makemake_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'makemake.py')
+
+# Texts of the files of the initial project
+initial_files = {'a.h': ['int f_a(int x);'],
+                 'b.h': ['#include "a.h"', 'int f_b(int x);'],
+                 'c.h': ['int f_c(int x);'],
+                 'a.c': ['#include "a.h"', 'int f_a(int x)', '{', '    return x + 1;', '}'],
+                 'b.c': ['#include "b.h"', 'int f_b(int x)', '{', '    return f_a(x) + 1;', '}'],
+                 'c.c': ['#include "c.h"', 'int f_c(int x)', '{', '    return x + 3;', '}'],
+                 'main.c': ['#include "b.h"', '#include "c.h"',
+                            'int main(void)', '{', '    return f_b(0) + f_c(0);', '}']}
+
+# Edits applied one after another, as the files they write or remove
+edits = [{'c.c': ['#include "c.h"', 'int f_c(int x)', '{', '    return x + 4;', '}']},
+         {'c.c': ['#include "c.h"', '#include "a.h"', 'int f_c(int x)', '{',
+                  '    return f_a(x) + 3;', '}']},
+         {'d.h': ['int f_d(int x);'],
+          'd.c': ['#include "d.h"', 'int f_d(int x)', '{', '    return x + 5;', '}'],
+          'b.h': ['#include "a.h"', '#include "d.h"', 'int f_b(int x);'],
+          'b.c': ['#include "b.h"', 'int f_b(int x)', '{', '    return f_a(x) + f_d(x);', '}']},
+         {'a.c': None,
+          'b.c': ['#include "b.h"', 'int f_a(int x)', '{', '    return x + 1;', '}',
+                  'int f_b(int x)', '{', '    return f_a(x) + f_d(x);', '}']}]
+
+
+def write_files(directory, files):
+
+    # This function writes the files with text and removes the files
+    # without text.
+
+    for filename, lines in files.items():
+
+        filename_with_path = os.path.join(directory, filename)
+
+        if lines is None:
+            os.remove(filename_with_path)
+        else:
+            f = open(filename_with_path, 'w')
+            f.write('\n'.join(lines) + '\n')
+            f.close()
+
+
+def generate_makefile(directory, sources, extra_args):
+
+    # This function runs makemake.py on the given sources, and returns its
+    # output and the makefile without the line naming the generation time.
+
+    command = [sys.executable, makemake_path] + sources + ['--batch', '--existing', 'overwrite'] + extra_args
+
+    result = subprocess.run(command, cwd=directory, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, universal_newlines=True)
+
+    if result.returncode != 0:
+        raise AssertionError('\"{}\" failed:\n{}'.format(' '.join(command), result.stdout))
+
+    f = open(os.path.join(directory, 'makefile'), 'r')
+    makefile = re.sub(r'makemake\.py \(.*\)', '', f.read())
+    f.close()
+
+    return result.stdout, makefile
+
+
+def check_incremental_runs():
+
+    # This function applies the edits in a temporary directory and raises
+    # an AssertionError if an incremental run gives a different makefile
+    # than a run from scratch, or reuses no dependencies.
+
+    directory = tempfile.mkdtemp(prefix='makemake_incremental_')
+
+    try:
+
+        write_files(directory, initial_files)
+
+        files = dict(initial_files)
+        generate_makefile(directory, ['main.c', 'a.c', 'b.c', 'c.c'], ['--incremental'])
+
+        for i, edit in enumerate(edits):
+
+            write_files(directory, edit)
+
+            files.update(edit)
+            sources = ['main.c'] + sorted(filename for filename, lines in files.items()
+                                          if filename.endswith('.c') and filename != 'main.c'
+                                          and lines is not None)
+
+            output, incremental_makefile = generate_makefile(directory, sources, ['--incremental'])
+            fresh_output, fresh_makefile = generate_makefile(directory, sources, [])
+
+            if incremental_makefile != fresh_makefile:
+                raise AssertionError('Edit {} gave a different makefile:\n{}\ninstead of:\n{}'
+                                     .format(i + 1, incremental_makefile, fresh_makefile))
+
+            if not re.search(r'Reused the object dependencies of [1-9]', output):
+                raise AssertionError('Edit {} reused no dependencies:\n{}'.format(i + 1, output))
+
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_incremental_runs():
+
+    check_incremental_runs()
+
+
+if __name__ == '__main__':
+
+    check_incremental_runs()
+
+    print('All {} incremental runs matched the runs from scratch'.format(len(edits)))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+#
+# This program checks the removal of comments, string literals and
+# character literals from C and C++ text. It can also be run with pytest.
+#
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import makemake_lib
+
+# Pairs of texts and the texts that should remain after the removal
+cases = [('#include "a.h"\nint x; // comment "b"\n', '#include <a.h>\nint x; \n'),
+         ('f(/* g(x) */ y);', 'f(  y);'),
+         ('puts("don\'t call g(x)"); h();', 'puts(); h();'),
+         ('char c = \'"\'; g(c);', 'char c = ; g(c);'),
+         ('char c = \'\\\'\'; g(c);', 'char c = ; g(c);'),
+         ('long n = 1\'000\'000; g(n);', 'long n = 1\'000\'000; g(n);'),
+         ('unsigned m = 0xff\'ffu; g(m, \'x\');', 'unsigned m = 0xff\'ffu; g(m, );'),
+         ('double d = 1.5e+3\'0; g(d);', 'double d = 1.5e+3\'0; g(d);'),
+         ('wchar_t w = L\'"\'; g(w);', 'wchar_t w = L; g(w);'),
+         ('char8_t u = u8\'x\'; g(u);', 'char8_t u = u8; g(u);')]
+
+
+def check_removal():
+
+    # This function raises an AssertionError for every case in which the
+    # remaining text is not the expected one.
+
+    for text, expected_text in cases:
+
+        clean_text = makemake_lib.remove_c_comments_and_strings(text)
+
+        if clean_text != expected_text:
+            raise AssertionError('{!r} became {!r} instead of {!r}'
+                                 .format(text, clean_text, expected_text))
+
+
+def test_removal():
+
+    check_removal()
+
+
+if __name__ == '__main__':
+
+    check_removal()
+
+    print('All {} cases passed'.format(len(cases)))